@@ -0,0 +1,360 @@
+"""Offline benchmarks for the Skeleton Trending Boost Bot.
+
+Usage:
+    python benchmark.py memory [--users N]
+    python benchmark.py load [--users N] [--concurrency N] [--mash N] [--respect-limits]
+    python benchmark.py transport [--calls N] [--concurrency N] [--latency MS] [--pool-sizes N,N,...]
+    python benchmark.py fake-api [--port N] [--latency MS]
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import httpx
+from aiohttp import web
+from telegram import Bot, Update
+from telegram.error import TelegramError
+
+import bot as botmod
+
+# ==================== MEMORY PER USER ====================
+
+def legacy_initialize_user(orders: dict, user_data: dict, user_id: int):
+    """The dict-based initialize_user from before compact records"""
+    if user_id not in orders:
+        orders[user_id] = {
+            'chain': None,
+            'duration': None,
+            'token_address': None,
+            'telegram_link': None,
+            'twitter_link': None,
+            'order_date': None,
+            'status': 'pending',
+            'order_id': None
+        }
+
+    if user_id not in user_data:
+        user_data[user_id] = {
+            'username': '',
+            'orders': 0,
+            'total_spent': 0,
+            'join_date': datetime.now().isoformat()
+        }
+
+def measure(fn, users: int) -> float:
+    """Return bytes allocated per user by ``fn(user_id)`` that are still live"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for user_id in range(users):
+        fn(user_id)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / users
+
+def bench_memory(args):
+    users = args.users
+
+    orders, user_data = {}, {}
+    legacy = measure(lambda user_id: legacy_initialize_user(orders, user_data, user_id), users)
+    del orders, user_data
+
+    # Uncapped, to measure raw record size
+    botmod.MAX_CACHED_USERS = users * 3
+    b = botmod.SkeletonTrendingBot()
+    casual = measure(b.initialize_user, users)
+
+    def start_order(user_id):
+        b.initialize_user(users + user_id)
+        order = b.get_order(users + user_id)
+        order.chain = botmod.Chain.SOL
+        order.duration = botmod.Duration.H24
+    ordering = measure(start_order, users)
+    del b
+
+    # Default cap: memory stays flat however many users arrive
+    botmod.MAX_CACHED_USERS = args.cap
+    b = botmod.SkeletonTrendingBot()
+    capped = measure(b.initialize_user, users)
+
+    print(f"Users: {users}")
+    print(f"{'':34}{'bytes/user':>12}")
+    print(f"{'legacy dicts (any user)':34}{legacy:>12.0f}")
+    print(f"{'slotted records (/start)':34}{casual:>12.0f}")
+    print(f"{'slotted records (started order)':34}{ordering:>12.0f}")
+    print(f"{f'slotted, capped at {args.cap}':34}{capped:>12.0f}  ({len(b.user_data)} resident)")
+
+# ==================== FAKE BOT API ====================
+
+FAKE_TOKEN = '123456:fake-token-for-benchmarks'
+FAKE_BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Skeleton', 'username': 'skeleton_bench_bot'}
+
+async def fake_api_call(request: web.Request) -> web.Response:
+    """Answer any Bot API method with a plausible result, as fast as possible"""
+    if request.content_type == 'application/json':
+        params = await request.json()
+    else:
+        params = {key: value for key, value in (await request.post()).items()}
+    method = request.match_info['method']
+    if request.app['latency']:
+        await asyncio.sleep(request.app['latency'])
+
+    if method == 'getMe':
+        result = FAKE_BOT_USER
+    elif method in ('sendMessage', 'editMessageText', 'editMessageReplyMarkup'):
+        chat_id = int(params.get('chat_id', 0))
+        result = {
+            'message_id': int(params.get('message_id', 1)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': FAKE_BOT_USER,
+            'text': params.get('text', ''),
+        }
+    else:
+        result = True
+    return web.json_response({'ok': True, 'result': result})
+
+def create_fake_api(latency: float = 0) -> web.Application:
+    """Fake Bot API; ``latency`` seconds are added to every call to stand in for the network"""
+    app = web.Application()
+    app['latency'] = latency
+    app.router.add_post('/bot{token}/{method}', fake_api_call)
+    app.router.add_get('/bot{token}/{method}', fake_api_call)
+    return app
+
+def run_fake_api(args):
+    web.run_app(create_fake_api(args.latency / 1000), host='127.0.0.1', port=args.port, print=None, access_log=None)
+
+class FakeApiProcess:
+    """Fake Bot API in a child process, so it does not share the bot's CPU"""
+
+    def __init__(self, port: int, latency: float = 0):
+        self.port = port
+        self.latency = latency
+        self.url = f"http://127.0.0.1:{port}/bot"
+        self.process = None
+
+    async def __aenter__(self):
+        self.process = subprocess.Popen([sys.executable, __file__, 'fake-api', '--port', str(self.port),
+                                         '--latency', str(self.latency)])
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    await client.post(f"{self.url}{FAKE_TOKEN}/getMe")
+                    return self
+                except httpx.TransportError:
+                    await asyncio.sleep(0.05)
+        raise RuntimeError("fake Bot API did not start")
+
+    async def __aexit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+# ==================== CONVERSATION LOAD ====================
+
+JOURNEY = (
+    ('start', 'text', '/start'),
+    ('boost', 'callback', botmod.callback_data('main')),
+    ('chain', 'callback', botmod.callback_data('chain', botmod.Chain.SOL)),
+    ('duration', 'callback', botmod.callback_data('dur', botmod.Duration.H24)),
+    ('address', 'text', 'So11111111111111111111111111111111111111112'),
+    ('telegram', 'text', 'https://t.me/skeleton_bench'),
+    ('twitter', 'text', '@skeleton_bench'),
+    # The summary's payment button names the order just submitted
+    ('payment_sent', 'callback', lambda user_id: botmod.callback_data('paid', botmod.bot.get_order(user_id).order_id)),
+)
+
+def make_update(update_id: int, user_id: int, kind: str, payload: str) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': f"user{user_id}", 'username': f"user{user_id}"}
+    message = {'message_id': update_id, 'date': int(time.time()), 'chat': {'id': user_id, 'type': 'private'}}
+    if kind == 'text':
+        message.update({'from': user, 'text': payload})
+        if payload.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(payload)}]
+        return {'update_id': update_id, 'message': message}
+    # Buttons sit on the bot's own message; the fake API numbers every sent message 1
+    message.update({'from': FAKE_BOT_USER, 'message_id': 1})
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'from': user, 'chat_instance': str(user_id), 'data': payload, 'message': message}}
+
+def rss_bytes() -> int:
+    """Current resident set size, or peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def run_load(args):
+    botmod.BOT_TOKEN = FAKE_TOKEN
+    botmod.BOT_MODE = 'webhook'
+    if not args.respect_limits:
+        # Measure the bot, not Telegram's flood limits
+        botmod.outbound = botmod.OutboundScheduler(global_rate=1e9, private_rate=1e9, group_rate=1e9)
+    store_dir = tempfile.TemporaryDirectory()
+    botmod.bot.open_store(botmod.SQLiteStore(os.path.join(store_dir.name, 'load.db')))
+
+    async with FakeApiProcess(args.port) as api:
+        application = botmod.build_application(base_url=api.url)
+        async with application:
+            gc.collect()
+            rss_before = rss_bytes()
+            # Impatient users press the boost button again while the chain menu is already up
+            steps = JOURNEY[:2] + (('boost again', 'callback', botmod.callback_data('main')),) * args.mash + JOURNEY[2:]
+            timings = {step: [] for step, _, _ in steps}
+            errors = []
+            update_ids = iter(range(1, 1 << 62))
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def journey(user_id: int):
+                async with semaphore:
+                    for step, kind, payload in steps:
+                        if callable(payload):
+                            payload = payload(user_id)
+                        update = Update.de_json(make_update(next(update_ids), user_id, kind, payload), application.bot)
+                        start = time.perf_counter()
+                        await application.update_processor.process_update(update, application.process_update(update))
+                        timings[step].append(time.perf_counter() - start)
+
+            async def record_error(update, context):
+                errors.append(context.error)
+
+            application.add_error_handler(record_error)
+            started = time.perf_counter()
+            await asyncio.gather(*(journey(1_000_000 + n) for n in range(args.users)))
+            elapsed = time.perf_counter() - started
+            api_calls = botmod.outbound.sent
+            gc.collect()
+            rss_after = rss_bytes()
+
+    botmod.bot.store.close()
+    store_dir.cleanup()
+
+    updates = args.users * len(steps)
+    print(f"Users: {args.users}  concurrency: {args.concurrency}  flood limits: {'on' if args.respect_limits else 'off'}")
+    print(f"Updates: {updates} in {elapsed:.2f}s = {updates / elapsed:.0f} updates/s, "
+          f"{args.users / elapsed:.1f} journeys/s")
+    print(f"Submitted orders: {len(botmod.bot.order_index)}  errors: {len(errors)}")
+    print(f"Bot API calls: {api_calls} ({api_calls / updates:.2f} per update)  "
+          f"message cache: {botmod.message_cache.stats()}")
+    print(f"{'step':14}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, values in timings.items():
+        print(f"{step:14}{percentile(values, 0.5) * 1000:>10.2f}{percentile(values, 0.99) * 1000:>10.2f}"
+              f"{max(values) * 1000:>10.2f}")
+    print(f"RSS growth: {(rss_after - rss_before) / 1024 / 1024:.1f} MiB "
+          f"({(rss_after - rss_before) / args.users:.0f} bytes/user)")
+    print(f"Conversation states: {botmod.metrics.conversations.counts}")
+    if errors:
+        print(f"First error: {errors[0]!r}")
+        sys.exit(1)
+
+def bench_load(args):
+    asyncio.run(run_load(args))
+
+# ==================== TRANSPORT ====================
+
+async def measure_transport(api_url: str, calls: int, concurrency: int, settings: dict) -> dict:
+    """Send ``calls`` messages, ``concurrency`` at a time, through one transport"""
+    request = botmod.create_api_request(**settings)
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    async with Bot(FAKE_TOKEN, base_url=api_url, request=request) as telegram_bot:
+
+        async def call(chat_id: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await telegram_bot.send_message(chat_id=chat_id, text="benchmark")
+                except TelegramError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call(chat_id) for chat_id in range(calls)))
+        elapsed = time.perf_counter() - started
+    return {
+        'http_version': request.http_version,
+        'rate': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.5) if latencies else float('nan'),
+        'p99': percentile(latencies, 0.99) if latencies else float('nan'),
+        'errors': errors,
+        'pool_timeouts': request.pool_timeouts,
+    }
+
+async def run_transport(args):
+    variants = [
+        ("PTB Bot() default: pool 1, 1s pool timeout", {'pool_size': 1, 'keepalive': 1, 'pool_timeout': 1.0}),
+        ("PTB builder default: pool 256, 1s pool timeout", {'pool_size': 256, 'keepalive': 256, 'pool_timeout': 1.0}),
+    ]
+    variants += [(f"pool {size}", {'pool_size': size, 'keepalive': size}) for size in args.pool_sizes]
+    variants += [
+        (f"pool {botmod.API_POOL_SIZE}, no keep-alive", {'keepalive': 0}),
+        (f"pool {botmod.API_POOL_SIZE}, HTTP/2", {'http_version': '2'}),
+    ]
+
+    async with FakeApiProcess(args.port, args.latency) as api:
+        print(f"Calls: {args.calls}  concurrency: {args.concurrency}  API latency: {args.latency:g} ms")
+        print(f"{'transport':48}{'http':>6}{'calls/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'pool t/o':>10}")
+        for name, settings in variants:
+            result = await measure_transport(api.url, args.calls, args.concurrency, settings)
+            print(f"{name:48}{result['http_version']:>6}{result['rate']:>10.0f}{result['p50'] * 1000:>10.1f}"
+                  f"{result['p99'] * 1000:>10.1f}{result['errors']:>8}{result['pool_timeouts']:>10}")
+
+def bench_transport(args):
+    # One INFO line per request would dominate the output
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    args.pool_sizes = [int(size) for size in args.pool_sizes.split(',')]
+    asyncio.run(run_transport(args))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    memory = subparsers.add_parser('memory', help="bytes per user, legacy dicts vs compact records")
+    memory.add_argument('--users', type=int, default=200000)
+    memory.add_argument('--cap', type=int, default=botmod.MAX_CACHED_USERS)
+    memory.set_defaults(func=bench_memory)
+
+    load = subparsers.add_parser('load', help="full conversation journeys against a fake Bot API")
+    load.add_argument('--users', type=int, default=1000)
+    load.add_argument('--concurrency', type=int, default=200)
+    load.add_argument('--mash', type=int, default=0, help="extra presses of an already-shown button per user")
+    load.add_argument('--port', type=int, default=8765)
+    load.add_argument('--respect-limits', action='store_true', help="keep the outbound flood limits")
+    load.set_defaults(func=bench_load)
+
+    transport = subparsers.add_parser('transport', help="Bot API throughput per transport setting")
+    transport.add_argument('--calls', type=int, default=500)
+    transport.add_argument('--concurrency', type=int, default=128)
+    transport.add_argument('--latency', type=float, default=100, help="simulated API round trip in ms")
+    transport.add_argument('--pool-sizes', default='4,16,64')
+    transport.add_argument('--port', type=int, default=8765)
+    transport.set_defaults(func=bench_transport)
+
+    fake_api = subparsers.add_parser('fake-api', help="serve the fake Bot API used by 'load' and 'transport'")
+    fake_api.add_argument('--port', type=int, default=8765)
+    fake_api.add_argument('--latency', type=float, default=0, help="added to every call, in ms")
+    fake_api.set_defaults(func=run_fake_api)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
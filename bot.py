@@ -1,56 +1,2658 @@
 import os
+import atexit
 import logging
+import logging.handlers
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters, ConversationHandler
+from enum import Enum
+from types import MappingProxyType
+from typing import Mapping
+from telegram import Bot, Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.ext import Application, BasePersistence, BaseRateLimiter, BaseUpdateProcessor, CommandHandler, PersistenceInput, CallbackQueryHandler, ContextTypes, MessageHandler, filters, ConversationHandler
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+from telegram.request import BaseRequest, HTTPXRequest
 import asyncio
+import bisect
+import functools
+import hashlib
+import heapq
+import html
+import itertools
+import math
 import json
-import uuid
+import queue
+import random
+import re
+import secrets
+import signal
+import sqlite3
+import string
+import subprocess
 import threading
-from flask import Flask, jsonify
+from array import array
+import httpx
+import aiohttp
+from aiohttp import web
 import time
 import sys
 
-# Enable logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# ==================== LOGGING ====================
+
+class SamplingFilter(logging.Filter):
+    """Sample and rate-limit chatty log categories; warnings and errors always pass"""
+
+    def __init__(self, sample: dict = None, rate_limit: dict = None):
+        super().__init__()
+        self.sample = sample or {}
+        self.rate_limit = rate_limit or {}
+        self._seen = {}
+        self._windows = {}
+        self.dropped = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        category = getattr(record, 'category', record.name)
+        
+        every = self.sample.get(category)
+        if every:
+            seen = self._seen[category] = self._seen.get(category, 0) + 1
+            if seen % every != 1 % every:
+                return self._drop(category)
+        
+        limit = self.rate_limit.get(category)
+        if limit:
+            second = int(record.created)
+            window = self._windows.get(category)
+            if window is None or window[0] != second:
+                window = self._windows[category] = [second, 0]
+            window[1] += 1
+            if window[1] > limit:
+                return self._drop(category)
+        return True
+
+    def _drop(self, category: str) -> bool:
+        self.dropped[category] = self.dropped.get(category, 0) + 1
+        return False
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records unformatted so the logging thread renders them; drop instead of blocking when full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.overflowed = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.overflowed += 1
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        category = getattr(record, 'category', None)
+        if category:
+            entry['category'] = category
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def parse_log_categories(spec: str) -> dict:
+    """Parse ``'start=10,httpx=100'`` into ``{'start': 10, 'httpx': 100}``"""
+    categories = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        category, _, value = item.partition('=')
+        categories[category.strip()] = int(value)
+    return categories
+
+def setup_logging() -> tuple:
+    """Route all logging through a queue to a background writer thread; returns (handler, listener)"""
+    stream = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    handler = DeferredQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", 10000))))
+    handler.addFilter(SamplingFilter(
+        sample=parse_log_categories(os.getenv("LOG_SAMPLE", "start=10,httpx=100")),
+        rate_limit=parse_log_categories(os.getenv("LOG_RATE_LIMIT", ""))
+    ))
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), handlers=[handler])
+    
+    listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return handler, listener
+
+log_handler, log_listener = setup_logging()
 logger = logging.getLogger(__name__)
 
-# ==================== ENVIRONMENT VARIABLES ====================
+# ==================== ENVIRONMENT VARIABLES ====================
+
+# Bot Configuration
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+if not BOT_TOKEN:
+    logger.error("❌ BOT_TOKEN environment variable not set!")
+    logger.error("Please set BOT_TOKEN in Render environment variables")
+    # Don't crash - just warn, but bot won't work without token
+
+# Web Server Configuration
+PORT = int(os.environ.get('PORT', 10000))
+
+# Update delivery: "webhook" (default when a public URL is known) or "polling"
+WEBHOOK_URL = (os.getenv("WEBHOOK_URL") or os.getenv("RENDER_EXTERNAL_URL") or "").rstrip('/')
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+BOT_MODE = os.getenv("BOT_MODE", "webhook" if WEBHOOK_URL else "polling").lower()
+
+# Bot API endpoint, e.g. a self-hosted Bot API server; empty for api.telegram.org
+BOT_API_URL = os.getenv("BOT_API_URL", "")
+
+# Links and wallets come from the environment, optionally overridden by a
+# JSON file that is re-read on SIGHUP or when it changes (see load_config)
+CONFIG_FILE = os.getenv("CONFIG_FILE", "")
+CONFIG_WATCH_INTERVAL = 5
+
+# Staff access: Telegram user IDs allowed to look up any order, and the
+# bearer token for /admin HTTP endpoints (disabled when unset)
+ADMIN_USER_IDS = frozenset(int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(',') if user_id.strip())
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Chat that receives batched order digests (disabled when unset)
+ADMIN_CHAT_ID = int(os.environ["ADMIN_CHAT_ID"]) if os.getenv("ADMIN_CHAT_ID") else None
+ADMIN_DIGEST_INTERVAL = float(os.getenv("ADMIN_DIGEST_INTERVAL", 30))
+# With several workers, events go through the shared backend and only this worker sends digests
+DIGEST_WORKER = 0
+
+# Persistence ("sqlite" or "memory")
+STORE_BACKEND = os.getenv("STORE_BACKEND", "sqlite").lower()
+STORE_PATH = os.getenv("STORE_PATH", "skeleton_bot.db")
+
+# Scale-out (webhook mode): WORKERS > 1 runs a front router on PORT that
+# hashes each user to one of WORKERS processes listening on localhost from
+# WORKER_BASE_PORT. Each worker keeps its users in its own store shard;
+# order lookups and counters go through the shared store.
+WORKERS = int(os.getenv("WORKERS", 1))
+WORKER_INDEX = int(os.environ["WORKER_INDEX"]) if os.getenv("WORKER_INDEX") else None
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", PORT + 1))
+SHARED_STORE_PATH = os.getenv("SHARED_STORE_PATH", "{0}.shared{1}".format(*os.path.splitext(STORE_PATH)))
+if WORKER_INDEX is not None:
+    STORE_PATH = "{0}.shard{2}{1}".format(*os.path.splitext(STORE_PATH), WORKER_INDEX)
+
+# In-memory retention: unfinished orders are dropped after ORDER_TTL, idle
+# users are moved out of memory (kept in the store) after USER_TTL, and at
+# most MAX_CACHED_USERS profiles are held in memory
+ORDER_TTL = float(os.getenv("ORDER_TTL_HOURS", 24)) * 3600
+USER_TTL = float(os.getenv("USER_TTL_HOURS", 24)) * 3600
+MAX_CACHED_USERS = int(os.getenv("MAX_CACHED_USERS", 100000))
+EVICTION_INTERVAL = 300
+
+# Seconds between handing changed conversation states to the store
+PERSISTENCE_INTERVAL = float(os.getenv("PERSISTENCE_INTERVAL", 5))
+
+# Conversion rate feed: a JSON file path or http(s) URL returning {"chain": rate}
+RATE_SOURCE = os.getenv("RATE_SOURCE", "")
+RATE_REFRESH_INTERVAL = float(os.getenv("RATE_REFRESH_INTERVAL", 60))
+
+# Incoming payment feed: 'fake' for the in-memory test chain, or an indexer URL.
+# Unpaid orders stop being watched PAYMENT_TTL after they were placed
+PAYMENT_SOURCE = os.getenv("PAYMENT_SOURCE", "")
+PAYMENT_POLL_INTERVAL = float(os.getenv("PAYMENT_POLL_INTERVAL", 5))
+PAYMENT_TTL = float(os.getenv("PAYMENT_TTL_HOURS", 24)) * 3600
+
+# Outbound Bot API limits (messages per second)
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", 30))
+OUTBOUND_PRIVATE_CHAT_RATE = float(os.getenv("OUTBOUND_PRIVATE_CHAT_RATE", 1))
+OUTBOUND_GROUP_CHAT_RATE = float(os.getenv("OUTBOUND_GROUP_CHAT_RATE", 20 / 60))
+
+# Bot API transport for regular calls (getUpdates has its own connection):
+# pool size, idle keep-alive, HTTP version ("1.1", or "2" with
+# python-telegram-bot[http2]) and timeouts in seconds. API_METHOD_TIMEOUTS
+# overrides the read timeout per method, e.g. "answerCallbackQuery=2,sendMessage=10"
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 16))
+API_KEEPALIVE_CONNECTIONS = int(os.getenv("API_KEEPALIVE_CONNECTIONS", API_POOL_SIZE))
+API_KEEPALIVE_EXPIRY = float(os.getenv("API_KEEPALIVE_EXPIRY", 60))
+API_HTTP_VERSION = os.getenv("API_HTTP_VERSION", "1.1")
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 5))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", 5))
+API_WRITE_TIMEOUT = float(os.getenv("API_WRITE_TIMEOUT", 5))
+API_POOL_TIMEOUT = float(os.getenv("API_POOL_TIMEOUT", 10))
+API_METHOD_TIMEOUTS = {method.strip(): float(value) for method, _, value in
+                       (item.partition('=') for item in os.getenv("API_METHOD_TIMEOUTS", "").split(',') if item.strip())}
+
+# Updates processed at once; one user's updates are always handled in order
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 64))
+
+# Updates and callback queries already handled within UPDATE_DEDUP_WINDOW
+# seconds are dropped (at most UPDATE_DEDUP_SIZE remembered); presses of the
+# same button on the same message within DOUBLE_TAP_WINDOW count as one
+UPDATE_DEDUP_WINDOW = float(os.getenv("UPDATE_DEDUP_WINDOW", 600))
+UPDATE_DEDUP_SIZE = int(os.getenv("UPDATE_DEDUP_SIZE", 50000))
+DOUBLE_TAP_WINDOW = float(os.getenv("DOUBLE_TAP_WINDOW", 1))
+
+# Messages whose last rendered content is remembered, to skip no-op edits
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", 50000))
+
+# ==================== LINKS & WALLETS ====================
+
+class ConfigError(Exception):
+    """Raised when link or wallet configuration is invalid"""
+
+@dataclass(frozen=True)
+class Links:
+    community_group: str
+    nft_group: str
+    promotion_group: str
+    verify_trend: str
+    lounge_group: str
+    support_contact: str
+    support_url: str
+
+@dataclass(frozen=True)
+class Wallet:
+    address: str
+    network: str
+
+@dataclass(frozen=True)
+class BotConfig:
+    links: Links
+    wallets: Mapping[str, Wallet]
+
+    def wallet(self, chain_id: str) -> Wallet:
+        """Get wallet information for chain"""
+        return self.wallets.get(chain_id, self.wallets['sol'])
+
+# Link setting -> (environment variable, default)
+LINK_SETTINGS = {
+    'community_group': ("COMMUNITY_GROUP_LINK", "https://t.me/YourCommunityGroup"),
+    'nft_group': ("NFT_MINTING_GROUP_LINK", "https://t.me/YourNFTGroup"),
+    'promotion_group': ("PROMOTION_GROUP_LINK", "https://t.me/YourPromotionGroup"),
+    'verify_trend': ("VERIFY_TREND_LINK", "https://t.me/skeletontrend"),
+    'lounge_group': ("LOUNGE_GROUP_LINK", "https://t.me/skeletonlounge"),
+    'support_contact': ("SUPPORT_CONTACT", "@skeletondev")
+}
+
+# Chain -> (environment variable, default address, network label)
+WALLET_SETTINGS = {
+    'bsc': ("BSC_WALLET", "0xYourBNBWalletAddress", 'Binance Smart Chain (BEP20)'),
+    'eth': ("ETH_WALLET", "0xYourETHWalletAddress", 'Ethereum (ERC20)'),
+    'sol': ("SOL_WALLET", "YourSolanaWalletAddress", 'Solana'),
+    'base': ("BASE_WALLET", "0xYourBaseWalletAddress", 'Base Network'),
+    'pumpfun': ("PUMPFUN_WALLET", "YourSolanaWalletAddress", 'Solana'),
+    'possum': ("POSSUM_WALLET", "YourSolanaWalletAddress", 'Solana'),
+    'fourmeme': ("FOURMEME_WALLET", "0xYourBNBWalletAddress", 'Binance Smart Chain (BEP20)')
+}
+
+EVM_WALLET_CHAINS = frozenset({'bsc', 'eth', 'base', 'fourmeme'})
+
+def load_config(path: str = CONFIG_FILE) -> BotConfig:
+    """Load links and wallets from the environment, overridden by the JSON file at path; raises ConfigError if invalid"""
+    overrides = {}
+    if path:
+        try:
+            with open(path, encoding='utf-8') as f:
+                overrides = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Cannot read {path}: {e}") from e
+        if not isinstance(overrides, dict):
+            raise ConfigError(f"{path} must contain a JSON object")
+    link_overrides = overrides.get('links', {})
+    wallet_overrides = overrides.get('wallets', {})
+    for key, value in (('links', link_overrides), ('wallets', wallet_overrides)):
+        if not isinstance(value, dict):
+            raise ConfigError(f"{key} must be a JSON object, got {type(value).__name__}")
+    
+    links = {}
+    for key, (env_var, default) in LINK_SETTINGS.items():
+        if not isinstance(link_overrides.get(key, ''), str):
+            raise ConfigError(f"links.{key} must be a string")
+        value = str(link_overrides.get(key) or os.getenv(env_var, default)).strip()
+        if key == 'support_contact':
+            if not value.startswith('@') or len(value) < 2:
+                raise ConfigError(f"support_contact must be a @username, got {value!r}")
+        elif not value.startswith('https://'):
+            raise ConfigError(f"{key} must be an https:// link, got {value!r}")
+        links[key] = value
+    links['support_url'] = f"https://t.me/{links['support_contact'].lstrip('@')}"
+    
+    wallets = {}
+    for chain_id, (env_var, default, network) in WALLET_SETTINGS.items():
+        override = wallet_overrides.get(chain_id, {})
+        if isinstance(override, str):
+            override = {'address': override}
+        elif not isinstance(override, dict):
+            raise ConfigError(f"wallets.{chain_id} must be an address or an object, got {type(override).__name__}")
+        for field in ('address', 'network'):
+            if not isinstance(override.get(field, ''), str):
+                raise ConfigError(f"wallets.{chain_id}.{field} must be a string")
+        address = str(override.get('address') or os.getenv(env_var, default)).strip()
+        network = str(override.get('network') or network)
+        if not address or any(c.isspace() for c in address):
+            raise ConfigError(f"Wallet for {chain_id} is empty or contains whitespace")
+        if chain_id in EVM_WALLET_CHAINS and not address.startswith('0x'):
+            raise ConfigError(f"Wallet for {chain_id} must start with 0x, got {address!r}")
+        if 'Your' in address:
+            logger.warning(f"⚠️ Wallet for {chain_id} is still a placeholder: {address}")
+        wallets[chain_id] = Wallet(address, network)
+    
+    unknown = set(wallet_overrides) - set(WALLET_SETTINGS)
+    if unknown:
+        raise ConfigError(f"Unknown wallet chains: {', '.join(sorted(unknown))}")
+    
+    return BotConfig(Links(**links), MappingProxyType(wallets))
+
+def reload_config():
+    """Re-read links and wallets, keeping the current config if the new one is invalid"""
+    global config
+    try:
+        new_config = load_config()
+    except ConfigError as e:
+        logger.error(f"❌ Config reload failed, keeping current config: {e}")
+        return
+    if new_config != config:
+        config = new_config
+        bot.screens.invalidate()
+        logger.info("🔄 Config reloaded")
+
+config = load_config()
+
+# ==================== BOT CONFIGURATION ====================
+
+# Conversation states
+MAIN_MENU, SELECT_CHAIN, SELECT_DURATION, TOKEN_ADDRESS, TELEGRAM_LINK, TWITTER_LINK = range(6)
+
+class ValueEnum(str, Enum):
+    """String enum that compares, hashes and formats as its value"""
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+class Chain(ValueEnum):
+    BSC = 'bsc'
+    ETH = 'eth'
+    SOL = 'sol'
+    BASE = 'base'
+    PUMPFUN = 'pumpfun'
+    POSSUM = 'possum'
+    FOURMEME = 'fourmeme'
+
+class Duration(ValueEnum):
+    H4 = '4_hours'
+    H8 = '8_hours'
+    H12 = '12_hours'
+    H24 = '24_hours'
+
+    @property
+    def label(self) -> str:
+        return self.value.replace('_', ' ')
+
+class OrderStatus(ValueEnum):
+    PENDING = 'pending'
+    PAID = 'paid'
+    REJECTED = 'rejected'
+
+# ==================== ORDER RECORDS ====================
+
+class Order:
+    """A user's trending order, slotted to keep each record small"""
+
+    __slots__ = ('user_id', 'chain', 'duration', 'token_address', 'telegram_link', 'twitter_link',
+                 'order_date', 'status', 'order_id', 'touched', 'amount', 'pay_to', 'idempotency_key')
+
+    def __init__(self, user_id: int = None, chain: Chain = None, duration: Duration = None, token_address: str = None,
+                 telegram_link: str = None, twitter_link: str = None, order_date: float = None,
+                 status: OrderStatus = OrderStatus.PENDING, order_id: str = None, touched: float = None,
+                 amount: float = None, pay_to: str = None, idempotency_key: str = None):
+        self.user_id = user_id
+        self.chain = chain
+        self.duration = duration
+        self.token_address = token_address
+        self.telegram_link = telegram_link
+        self.twitter_link = twitter_link
+        self.order_date = order_date
+        self.status = status
+        self.order_id = order_id
+        self.touched = touched or time.time()
+        # Quoted payment amount and wallet, set when the order is submitted
+        self.amount = amount
+        self.pay_to = pay_to
+        # Identifies the request that submitted the order, so a redelivery reuses it
+        self.idempotency_key = idempotency_key
+
+    def submitted_for(self, idempotency_key: str) -> bool:
+        return idempotency_key is not None and self.order_id is not None and self.idempotency_key == idempotency_key
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Order':
+        order = cls(**data)
+        order.chain = order.chain and Chain(order.chain)
+        order.duration = order.duration and Duration(order.duration)
+        order.status = OrderStatus(order.status)
+        return order
+
+class UserProfile:
+    """Per-user profile kept alongside the user's order"""
+
+    __slots__ = ('username', 'orders', 'total_spent', 'join_date', 'touched', 'order_ids')
+
+    def __init__(self, username: str = '', orders: int = 0, total_spent: float = 0,
+                 join_date: float = None, touched: float = None, order_ids: tuple = ()):
+        self.username = username
+        self.orders = orders
+        self.total_spent = total_spent
+        self.join_date = join_date or time.time()
+        self.touched = touched or self.join_date
+        # IDs of every order the user submitted, oldest first
+        self.order_ids = tuple(order_ids)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'UserProfile':
+        return cls(**data)
+
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+def encode_order_id(millis: int, entropy: int) -> str:
+    """``ORD-`` plus 16 base32 chars: 48 bits of milliseconds, 32 bits of entropy"""
+    value = (millis << 32) | entropy
+    chars = []
+    for _ in range(16):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD_BASE32[digit])
+    return 'ORD-' + ''.join(reversed(chars))
+
+def new_order_id(taken) -> str:
+    """Return a time-sortable order ID not in ``taken``"""
+    while True:
+        order_id = encode_order_id(int(time.time() * 1000), secrets.randbits(32))
+        if order_id not in taken:
+            return order_id
+
+class OrderIndex:
+    """Submitted orders by ID, indexed by status, chain, duration and creation time"""
+
+    def __init__(self):
+        self._orders = {}
+        self._ids = []
+        self.by_status = {status: set() for status in OrderStatus}
+        self.by_chain = {chain: set() for chain in Chain}
+        self.by_duration = {duration: set() for duration in Duration}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._orders
+
+    def get(self, order_id: str):
+        return self._orders.get(order_id)
+
+    def add(self, order: Order):
+        order_id = order.order_id
+        if order_id in self._orders:
+            return
+        self._orders[order_id] = order
+        # New IDs are almost always the largest, making this an append
+        if not self._ids or order_id > self._ids[-1]:
+            self._ids.append(order_id)
+        else:
+            bisect.insort(self._ids, order_id)
+        self.by_status[order.status].add(order_id)
+        if order.chain:
+            self.by_chain[order.chain].add(order_id)
+        if order.duration:
+            self.by_duration[order.duration].add(order_id)
+
+    def set_status(self, order: Order, status: OrderStatus):
+        """Change an indexed order's status"""
+        self.by_status[order.status].discard(order.order_id)
+        order.status = status
+        self.by_status[status].add(order.order_id)
+
+    def query(self, status: OrderStatus = None, chain: Chain = None, duration: Duration = None,
+              since: float = None, until: float = None, cursor: str = None, limit: int = 50) -> tuple:
+        """Return ``(orders, next_cursor)`` for a page, oldest first"""
+        lower = encode_order_id(int(since * 1000), 0) if since is not None else ''
+        if cursor and cursor >= lower:
+            start = bisect.bisect_right(self._ids, cursor)
+        else:
+            start = bisect.bisect_left(self._ids, lower)
+        end = bisect.bisect_left(self._ids, encode_order_id(int(until * 1000), 0)) if until is not None else len(self._ids)
+        
+        filters = [index for index in (self.by_status.get(status), self.by_chain.get(chain), self.by_duration.get(duration))
+                   if index is not None]
+        filters.sort(key=len)
+        
+        if filters and len(filters[0]) * 16 < end - start:
+            # Selective filter: sort its matches instead of scanning the range
+            first = self._ids[start] if start < end else None
+            last = self._ids[end - 1] if start < end else None
+            matches = sorted(order_id for order_id in filters[0]
+                             if first is not None and first <= order_id <= last
+                             and all(order_id in index for index in filters[1:]))
+            page = matches[:limit + 1]
+        else:
+            page = []
+            for position in range(start, end):
+                order_id = self._ids[position]
+                if all(order_id in index for index in filters):
+                    page.append(order_id)
+                    if len(page) > limit:
+                        break
+        
+        next_cursor = page[limit - 1] if len(page) > limit else None
+        return [self._orders[order_id] for order_id in page[:limit]], next_cursor
+
+# ==================== METRICS ====================
+
+# Seconds; covers a cache-hit handler through a slow Bot API round trip
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STATE_NAMES = {
+    MAIN_MENU: 'main_menu',
+    SELECT_CHAIN: 'select_chain',
+    SELECT_DURATION: 'select_duration',
+    TOKEN_ADDRESS: 'token_address',
+    TELEGRAM_LINK: 'telegram_link',
+    TWITTER_LINK: 'twitter_link',
+}
+
+def format_labels(label: str, value: str, extra: str = '') -> str:
+    return '{' + f'{label}="{value}"' + (f',{extra}' if extra else '') + '}'
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is one bisect and three adds"""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class HistogramFamily:
+    """Histograms keyed by one label, created on first use"""
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._children = {}
+
+    def labels(self, value: str) -> Histogram:
+        child = self._children.get(value)
+        if child is None:
+            child = self._children[value] = Histogram()
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), child.counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.label, value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label, value)} {child.sum}")
+            lines.append(f"{self.name}_count{format_labels(self.label, value)} {child.count}")
+        return lines
+
+class CounterFamily:
+    """Counters keyed by one label"""
+
+    def __init__(self, name: str, help: str, label: str):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}
+
+    def inc(self, value: str, amount: int = 1):
+        self._values[value] = self._values.get(value, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, count in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.label, value)} {count}")
+        return lines
+
+class GaugeFamily:
+    """Gauges keyed by one label, read from ``collect()`` at scrape time"""
+
+    def __init__(self, name: str, help: str, label: str, collect):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.collect = collect
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for value, reading in sorted(self.collect().items()):
+            lines.append(f"{self.name}{format_labels(self.label, value)} {reading}")
+        return lines
+
+class ConversationStates:
+    """State of each user partway through the order flow, with running per-state counts"""
+
+    # Where every finished or idle conversation rests; not tracked
+    RESTING = (MAIN_MENU, ConversationHandler.END)
+
+    def __init__(self):
+        self._states = {}
+        self.counts = {name: 0 for state, name in STATE_NAMES.items() if state not in self.RESTING}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def set(self, user_id: int, state):
+        """Record a handler's returned state; None keeps the current one"""
+        if state is None:
+            return
+        self.forget(user_id)
+        if state not in self.RESTING and state in STATE_NAMES:
+            name = self._states[user_id] = STATE_NAMES[state]
+            self.counts[name] += 1
+
+    def forget(self, user_id: int):
+        """Stop tracking a user, e.g. once evicted from memory"""
+        previous = self._states.pop(user_id, None)
+        if previous is not None:
+            self.counts[previous] -= 1
+
+class Metrics:
+    """Process-wide metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.handler_latency = HistogramFamily(
+            'bot_handler_latency_seconds', "Update handler latency", 'handler')
+        self.api_latency = HistogramFamily(
+            'bot_telegram_api_latency_seconds', "Bot API call latency, excluding time queued", 'method')
+        self.loop_lag = HistogramFamily(
+            'bot_event_loop_lag_seconds', "Event loop scheduling delay", 'loop')
+        self.errors = CounterFamily(
+            'bot_errors_total', "Errors reaching the error handler", 'type')
+        self.conversations = ConversationStates()
+        self.families = [
+            self.handler_latency,
+            self.api_latency,
+            self.loop_lag,
+            self.errors,
+            GaugeFamily('bot_conversation_users', "Users in each conversation state", 'state',
+                        lambda: self.conversations.counts),
+        ]
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+def instrumented(handler):
+    """Time an update handler and track the conversation state it returns"""
+    latency = metrics.handler_latency.labels(handler.__name__)
+
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        start = time.perf_counter()
+        try:
+            state = await handler(update, context)
+        finally:
+            latency.observe(time.perf_counter() - start)
+        if update.effective_user:
+            metrics.conversations.set(update.effective_user.id, state)
+        return state
+    return wrapper
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Record how late the loop wakes this task up and publish health; runs until cancelled"""
+    lag = metrics.loop_lag.labels('main')
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        late = max(0.0, time.perf_counter() - start - interval)
+        lag.observe(late)
+        health_publisher.publish(late)
+
+# ==================== CALLBACK ROUTER ====================
+
+# Bump when the callback_data layout changes; buttons on older messages
+# are then rejected as expired instead of being misinterpreted
+CALLBACK_VERSION = '1'
+
+def callback_data(action: str, arg: str = '') -> str:
+    """Encode a button payload as ``<version>:<action>[:<arg>]``"""
+    if arg:
+        return f"{CALLBACK_VERSION}:{action}:{arg}"
+    return f"{CALLBACK_VERSION}:{action}"
+
+class CallbackRouter:
+    """Dispatch callback queries to per-action handlers, answering unknown ones as expired"""
+
+    def __init__(self):
+        self._routes = {}
+
+    def route(self, action: str, choices: type = None, answer: bool = True):
+        """Register ``handler(query, user_id, arg)`` for an action"""
+        def decorator(handler):
+            if choices is str:
+                args = None
+            else:
+                args = {member.value: member for member in choices} if choices else {None: None}
+            self._routes[action] = (handler, args, answer, metrics.handler_latency.labels(f'callback:{action}'))
+            return handler
+        return decorator
+
+    def resolve(self, data: str):
+        """Return ``(handler, arg, answer, latency)`` for a payload, or None if it is stale or unknown"""
+        parts = (data or '').split(':', 2)
+        if parts[0] != CALLBACK_VERSION or len(parts) < 2:
+            return None
+        route = self._routes.get(parts[1])
+        if route is None:
+            return None
+        handler, args, answer, latency = route
+        arg = parts[2] if len(parts) == 3 else None
+        if args is None:
+            return (handler, arg, answer, latency) if arg else None
+        if arg not in args:
+            return None
+        return handler, args[arg], answer, latency
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """CallbackQueryHandler callback"""
+        query = update.callback_query
+        resolved = self.resolve(query.data)
+        if resolved is None:
+            await answer_query(query, "⌛ This menu has expired. Send /start to begin again.")
+            return None
+        
+        start = time.perf_counter()
+        handler, arg, answer, latency = resolved
+        if answer:
+            await answer_query(query)
+        user_id = query.from_user.id
+        bot.initialize_user(user_id)
+        try:
+            state = await handler(query, user_id, arg)
+        finally:
+            latency.observe(time.perf_counter() - start)
+        metrics.conversations.set(user_id, state)
+        return state
+
+router = CallbackRouter()
+
+# ==================== OUTBOUND SCHEDULER ====================
+
+# Priorities for outbound Bot API calls (lower is sent first). Calls made
+# through message/query shortcuts are interactive; background notices pass
+# rate_limit_args=PRIORITY_NOTICE explicitly.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NOTICE = 1
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class OutboundScheduler(BaseRateLimiter):
+    """Rate limiter for every Bot API call: per-chat and global token buckets, priorities and edit coalescing"""
+
+    # Edits where only the latest pending call matters
+    COALESCED_ENDPOINTS = frozenset({'editMessageText', 'editMessageReplyMarkup'})
+    # Calls that do not post into a chat and so skip the per-chat bucket
+    UNCHATTED_ENDPOINTS = frozenset({'answerCallbackQuery', 'getMe', 'setWebhook', 'deleteWebhook'})
+
+    def __init__(self, global_rate: float = 30, private_rate: float = 1, group_rate: float = 20 / 60,
+                 chat_burst: float = 3, max_retries: int = 3):
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self._prune_at = 10000
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._paused_until = 0.0
+        self._latest_edit = {}
+
+        # Metrics
+        self._queued = [0, 0]
+        self._chat_waiting = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.flood_waits = 0
+
+    async def initialize(self):
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        # Let anything still queued go out unthrottled
+        while self._heap:
+            priority, _, future = heapq.heappop(self._heap)
+            self._queued[priority] -= 1
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        """Queue depths and counters for health reporting"""
+        return {
+            'queued_interactive': self._queued[PRIORITY_INTERACTIVE],
+            'queued_notice': self._queued[PRIORITY_NOTICE],
+            'waiting_on_chat_limit': self._chat_waiting,
+            'tracked_chats': len(self._chats),
+            'sent': self.sent,
+            'coalesced_edits': self.coalesced,
+            'flood_waits': self.flood_waits,
+            'paused_for': round(max(0.0, self._paused_until - time.monotonic()), 3)
+        }
+
+    async def _dispatch_loop(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self._global.delay(now))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            priority, _, future = heapq.heappop(self._heap)
+            self._queued[priority] -= 1
+            if future.done():
+                # Caller was cancelled while queued
+                continue
+            self._global.take()
+            future.set_result(None)
+
+    async def _wait_for_slot(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self._queued[priority] += 1
+        self._wakeup.set()
+        await future
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self._prune_at:
+                now = time.monotonic()
+                for idle_chat in [key for key, value in self._chats.items() if value.idle(now)]:
+                    del self._chats[idle_chat]
+                self._prune_at = max(10000, 2 * len(self._chats))
+            # Private chats have positive IDs; groups, channels and @usernames do not
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            rate = self.private_rate if is_private else self.group_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    async def _wait_for_chat(self, chat_id):
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            delay = bucket.delay(time.monotonic())
+            if delay <= 0:
+                bucket.take()
+                return
+            self._chat_waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._chat_waiting -= 1
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = PRIORITY_NOTICE if rate_limit_args == PRIORITY_NOTICE else PRIORITY_INTERACTIVE
+        chat_id = data.get('chat_id')
+
+        edit_key = token = None
+        if endpoint in self.COALESCED_ENDPOINTS:
+            edit_key = (endpoint, chat_id, data.get('message_id'), data.get('inline_message_id'))
+            token = self._latest_edit[edit_key] = object()
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                if chat_id is not None and endpoint not in self.UNCHATTED_ENDPOINTS:
+                    await self._wait_for_chat(chat_id)
+                if token is not None and self._latest_edit.get(edit_key) is not token:
+                    # A newer edit of this message is queued; it carries the final content
+                    self.coalesced += 1
+                    return True
+
+                await self._wait_for_slot(priority)
+                if token is not None and self._latest_edit.get(edit_key) is not token:
+                    # Superseded while queued; hand the global slot back
+                    self._global.tokens += 1
+                    self.coalesced += 1
+                    return True
+                start = time.perf_counter()
+                try:
+                    result = await callback(*args, **kwargs)
+                except RetryAfter as e:
+                    self.flood_waits += 1
+                    self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                    logger.warning("Flood limit on %s, pausing outbound queue for %ss", endpoint, e.retry_after)
+                    if attempt == self.max_retries:
+                        raise
+                    continue
+                finally:
+                    metrics.api_latency.labels(endpoint).observe(time.perf_counter() - start)
+                self.sent += 1
+                return result
+        finally:
+            if token is not None and self._latest_edit.get(edit_key) is token:
+                del self._latest_edit[edit_key]
+
+# Shared by every Application instance the runner creates. Workers share
+# one bot token, so each gets its share of the bot-wide and group limits;
+# a private chat only ever talks to its user's worker
+outbound_share = WORKERS if WORKER_INDEX is not None else 1
+outbound = OutboundScheduler(
+    global_rate=OUTBOUND_GLOBAL_RATE / outbound_share,
+    private_rate=OUTBOUND_PRIVATE_CHAT_RATE,
+    group_rate=OUTBOUND_GROUP_CHAT_RATE / outbound_share
+)
+
+# ==================== BOT API TRANSPORT ====================
+
+class ApiRequest(HTTPXRequest):
+    """HTTPXRequest with keep-alive tuning, per-method read timeouts and connectivity reporting"""
+
+    def __init__(self, pool_size: int, keepalive: int = None, keepalive_expiry: float = 5.0,
+                 method_timeouts: Mapping = None, **kwargs):
+        # Read by _build_client, which HTTPXRequest.__init__ calls
+        self._limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size if keepalive is None else keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        super().__init__(connection_pool_size=pool_size, **kwargs)
+        self.method_timeouts = dict(method_timeouts or {})
+        self.pool_timeouts = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        self._client_kwargs['limits'] = self._limits
+        return super()._build_client()
+
+    async def do_request(self, url: str, method: str, request_data=None,
+                         read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE, pool_timeout=BaseRequest.DEFAULT_NONE):
+        if read_timeout is BaseRequest.DEFAULT_NONE and self.method_timeouts:
+            read_timeout = self.method_timeouts.get(url.rpartition('/')[2], read_timeout)
+        try:
+            code, payload = await super().do_request(
+                url, method, request_data, read_timeout=read_timeout, write_timeout=write_timeout,
+                connect_timeout=connect_timeout, pool_timeout=pool_timeout
+            )
+        except NetworkError as e:
+            if isinstance(e.__cause__, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+            else:
+                api_connectivity.failed(e)
+            raise
+        if code >= 500:
+            api_connectivity.failed(f"HTTP {code}")
+        else:
+            api_connectivity.ok()
+        return code, payload
+
+def create_api_request(**overrides) -> ApiRequest:
+    """Bot API transport from the API_* settings; ``overrides`` replace single settings"""
+    settings = {
+        'pool_size': API_POOL_SIZE,
+        'keepalive': API_KEEPALIVE_CONNECTIONS,
+        'keepalive_expiry': API_KEEPALIVE_EXPIRY,
+        'http_version': API_HTTP_VERSION,
+        'method_timeouts': API_METHOD_TIMEOUTS,
+        'connect_timeout': API_CONNECT_TIMEOUT,
+        'read_timeout': API_READ_TIMEOUT,
+        'write_timeout': API_WRITE_TIMEOUT,
+        'pool_timeout': API_POOL_TIMEOUT,
+    }
+    settings.update(overrides)
+    try:
+        return ApiRequest(**settings)
+    except RuntimeError as e:
+        # HTTP/2 without the h2 package
+        if settings['http_version'] == '1.1':
+            raise
+        logger.warning(f"⚠️ {e} Falling back to HTTP/1.1.")
+        settings['http_version'] = '1.1'
+        return ApiRequest(**settings)
+
+# ==================== UPDATE PROCESSING ====================
+
+class RecentIds:
+    """Keys seen in the last ``window`` seconds, at most ``max_entries`` of them"""
+
+    def __init__(self, window: float, max_entries: int):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+
+    def seen(self, key) -> bool:
+        """Record ``key``; True if it was already seen within the window"""
+        now = time.monotonic()
+        cutoff = now - self.window
+        seen = self._seen
+        while seen:
+            oldest, stamp = next(iter(seen.items()))
+            if stamp >= cutoff and len(seen) < self.max_entries:
+                break
+            del seen[oldest]
+        if key in seen:
+            return True
+        seen[key] = now
+        return False
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently, each user's in order, dropping redeliveries and double taps"""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self.recent_updates = RecentIds(UPDATE_DEDUP_WINDOW, UPDATE_DEDUP_SIZE)
+        self.recent_taps = RecentIds(DOUBLE_TAP_WINDOW, UPDATE_DEDUP_SIZE)
+        self.duplicates = 0
+        # key -> [lock, updates holding or waiting for it]
+        self._locks = {}
+        # Updates handed to the processor and not yet finished, waiting or running
+        self.pending = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.last_update = None
+
+    @staticmethod
+    def serialization_key(update: object):
+        """Updates with the same key run one at a time, in arrival order"""
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    def is_redelivery(self, update: object) -> bool:
+        if not isinstance(update, Update):
+            return False
+        if self.recent_updates.seen(update.update_id):
+            return True
+        return update.callback_query is not None and self.recent_updates.seen(('callback', update.callback_query.id))
+
+    def is_double_tap(self, update: object) -> bool:
+        query = update.callback_query if isinstance(update, Update) else None
+        if query is None:
+            return False
+        message_id = query.message.message_id if query.message else query.inline_message_id
+        return self.recent_taps.seen((query.from_user.id, message_id, query.data))
+
+    async def process_update(self, update: object, coroutine):
+        if self.is_redelivery(update):
+            coroutine.close()
+            self.duplicates += 1
+            return
+        if self.is_double_tap(update):
+            coroutine.close()
+            self.duplicates += 1
+            # Each tap is its own query; answer it so the client stops spinning
+            try:
+                await update.callback_query.answer()
+            except TelegramError:
+                pass
+            return
+        self.pending += 1
+        try:
+            await self._process_in_order(update, coroutine)
+        finally:
+            self.pending -= 1
+
+    async def _process_in_order(self, update: object, coroutine):
+        key = self.serialization_key(update)
+        if key is None:
+            return await super().process_update(update, coroutine)
+        
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters first come, first served
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def do_process_update(self, update: object, coroutine):
+        self.in_flight += 1
+        self.last_update = time.time()
+        try:
+            await coroutine
+        finally:
+            self.in_flight -= 1
+            self.processed += 1
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            'max_concurrent': self.max_concurrent_updates,
+            'pending': self.pending,
+            'in_flight': self.in_flight,
+            'users_active': len(self._locks),
+            'processed': self.processed,
+            'duplicates': self.duplicates,
+            'last_update': datetime.fromtimestamp(self.last_update).isoformat() if self.last_update else None,
+        }
+
+# Shared by every Application instance the runner creates
+update_processor = PerUserUpdateProcessor(UPDATE_CONCURRENCY)
+
+# ==================== PRICING ====================
+
+class PriceSnapshot:
+    """Immutable duration × chain price matrix, replaced rather than mutated on refresh"""
+
+    __slots__ = ('version', 'rates', 'matrix', '_durations', '_chains')
+
+    def __init__(self, version: int, base_prices: dict, rates: dict):
+        self.version = version
+        self.rates = dict(rates)
+        self._durations = {duration: row for row, duration in enumerate(base_prices)}
+        self._chains = {chain: column for column, chain in enumerate(rates)}
+        # Outer product of base prices and conversion rates in one pass
+        self.matrix = memoryview(array('d', [
+            round(base * rate, 3) for base in base_prices.values() for rate in rates.values()
+        ])).toreadonly()
+
+    def price(self, duration: str, chain: str) -> float:
+        return self.matrix[self._durations[duration] * len(self._chains) + self._chains[chain]]
+
+    def changed_chains(self, other: 'PriceSnapshot') -> set:
+        """Chains whose price column differs between two snapshots"""
+        return {chain for chain in self._chains
+                if any(self.price(duration, chain) != other.price(duration, chain) for duration in self._durations)}
+
+class RateSource:
+    """Source of conversion rates: units of each chain's currency per SOL"""
+
+    async def fetch(self) -> dict:
+        raise NotImplementedError
+
+class FileRateSource(RateSource):
+    """Reads rates from a local JSON file such as ``{"eth": 0.05, "bsc": 0.45}``"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def fetch(self) -> dict:
+        return await asyncio.to_thread(self._read)
+
+    def _read(self) -> dict:
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+class HttpRateSource(RateSource):
+    """Fetches the same JSON document from an HTTP endpoint"""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+
+    async def fetch(self) -> dict:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            return response.json()
+
+def create_rate_source(spec: str):
+    """Create a rate source from RATE_SOURCE (a URL or a file path), or None"""
+    if not spec:
+        return None
+    if spec.startswith(('http://', 'https://')):
+        return HttpRateSource(spec)
+    return FileRateSource(spec)
+
+class PricingEngine:
+    """Owns the current price snapshot and refreshes it from a rate source"""
+
+    def __init__(self, base_prices: dict, rates: dict, source: RateSource = None, on_change=None):
+        self.base_prices = dict(base_prices)
+        self.source = source
+        self.on_change = on_change
+        self.snapshot = PriceSnapshot(1, self.base_prices, rates)
+
+    def publish(self, rates: dict) -> set:
+        """Recompute the matrix from ``rates`` and swap it in; returns changed chains"""
+        current = self.snapshot
+        merged = dict(current.rates)
+        for chain, rate in rates.items():
+            if chain not in merged:
+                continue
+            rate = float(rate)
+            if not math.isfinite(rate) or rate <= 0:
+                raise ValueError(f"Invalid conversion rate for {chain}: {rate}")
+            merged[chain] = rate
+        
+        snapshot = PriceSnapshot(current.version + 1, self.base_prices, merged)
+        changed = snapshot.changed_chains(current)
+        if changed:
+            self.snapshot = snapshot
+            if self.on_change:
+                self.on_change(changed)
+        return changed
+
+    async def refresh(self) -> set:
+        """Fetch rates from the source and publish them"""
+        return self.publish(await self.source.fetch())
+
+# ==================== TOKEN ADDRESS VALIDATION ====================
+
+_KECCAK_ROUND_CONSTANTS = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008
+)
+
+# Rotation offset of lane (x, y), indexed [x][y]
+_KECCAK_ROTATIONS = (
+    (0, 36, 3, 41, 18),
+    (1, 44, 10, 45, 2),
+    (62, 6, 43, 15, 61),
+    (28, 55, 25, 21, 56),
+    (27, 20, 39, 8, 14)
+)
+
+_MASK64 = (1 << 64) - 1
+
+def _rotl64(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & _MASK64 if shift else value
+
+def _keccak_f(state: list):
+    for round_constant in _KECCAK_ROUND_CONSTANTS:
+        # Theta
+        c = [state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rotl64(c[(x + 1) % 5], 1) for x in range(5)]
+        for i in range(25):
+            state[i] ^= d[i % 5]
+        # Rho and pi
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = _rotl64(state[x + 5 * y], _KECCAK_ROTATIONS[x][y])
+        # Chi
+        for y in range(0, 25, 5):
+            for x in range(5):
+                state[x + y] = b[x + y] ^ (~b[(x + 1) % 5 + y] & b[(x + 2) % 5 + y])
+        # Iota
+        state[0] ^= round_constant
+
+def keccak256(data: bytes) -> bytes:
+    """Keccak-256 as used by Ethereum (not the padded NIST SHA3-256)"""
+    rate = 136
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(bytes(-len(padded) % rate))
+    padded[-1] |= 0x80
+    
+    state = [0] * 25
+    for offset in range(0, len(padded), rate):
+        for i in range(rate // 8):
+            state[i] ^= int.from_bytes(padded[offset + 8 * i:offset + 8 * i + 8], 'little')
+        _keccak_f(state)
+    return b''.join(lane.to_bytes(8, 'little') for lane in state[:4])
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+
+def base58_decode(text: str) -> bytes:
+    value = 0
+    for char in text:
+        value = value * 58 + _BASE58_INDEX[char]
+    leading_zeros = len(text) - len(text.lstrip('1'))
+    return bytes(leading_zeros) + value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+def to_checksum_address(address: str) -> str:
+    """EIP-55 mixed-case checksum encoding of a 0x address"""
+    digits = address[2:].lower()
+    digest = keccak256(digits.encode('ascii')).hex()
+    return '0x' + ''.join(char.upper() if int(nibble, 16) >= 8 else char for char, nibble in zip(digits, digest))
+
+class AddressValidator:
+    """Per-chain token address checks with an LRU cache; ``validate`` returns None or a reason"""
+
+    SOLANA_CHAINS = frozenset({'sol', 'pumpfun', 'possum'})
+    EVM_CHAINS = frozenset({'eth', 'base', 'bsc', 'fourmeme'})
+
+    _BASE58_RE = re.compile(r'[1-9A-HJ-NP-Za-km-z]{32,44}')
+    _EVM_RE = re.compile(r'0x[0-9a-fA-F]{40}')
+
+    def __init__(self, cache_size: int = 4096):
+        self.validate = functools.lru_cache(maxsize=cache_size)(self._validate)
+
+    def _validate(self, chain: str, address: str):
+        if chain in self.SOLANA_CHAINS:
+            if not self._BASE58_RE.fullmatch(address):
+                return "must be 32-44 base58 characters"
+            if len(base58_decode(address)) != 32:
+                return "does not decode to a 32-byte public key"
+            return None
+        
+        if chain in self.EVM_CHAINS:
+            if not self._EVM_RE.fullmatch(address):
+                return "must be 0x followed by 40 hex characters"
+            digits = address[2:]
+            if digits != digits.lower() and digits != digits.upper() and to_checksum_address(address) != address:
+                return "has an invalid EIP-55 checksum"
+            return None
+        
+        return f"unsupported chain {chain!r}"
+
+    def validate_many(self, items) -> list:
+        """Validate ``(chain, address)`` pairs; returns ``(chain, address, reason)`` for each"""
+        return [(chain, address, self.validate(chain, address)) for chain, address in items]
+
+address_validator = AddressValidator()
+
+# ==================== PAYMENT MATCHING ====================
+
+def wallet_key(address: str) -> str:
+    """EVM addresses are case-insensitive; base58 addresses are not"""
+    return address.lower() if address.startswith('0x') else address
+
+def amount_key(amount: float) -> int:
+    """Amounts compared in nano-units so float noise cannot break a match"""
+    return round(amount * 1_000_000_000)
+
+# Launchpad chains are paid on their base chain, often to the same wallet
+PAYMENT_NETWORKS = {'pumpfun': 'sol', 'possum': 'sol', 'fourmeme': 'bsc'}
+
+def payment_network(chain: str) -> str:
+    """Network a chain's payments settle on"""
+    chain = str(chain)
+    return PAYMENT_NETWORKS.get(chain, chain)
+
+@dataclass(frozen=True)
+class Transfer:
+    """An incoming transfer to one of the payment wallets"""
+    tx_hash: str
+    chain: str
+    wallet: str
+    amount: float
+    memo: str = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Transfer':
+        """Validate and coerce an indexer item; raises ValueError if it is unusable"""
+        if not isinstance(data, dict):
+            raise ValueError(f"expected an object, got {type(data).__name__}")
+        for field in ('tx_hash', 'chain', 'wallet'):
+            if not isinstance(data.get(field), str) or not data[field]:
+                raise ValueError(f"{field} must be a non-empty string")
+        amount = data.get('amount')
+        if isinstance(amount, bool) or not isinstance(amount, (int, float, str)):
+            raise ValueError(f"amount must be a number, got {amount!r}")
+        try:
+            amount = float(amount)
+        except ValueError:
+            raise ValueError(f"amount must be a number, got {amount!r}") from None
+        if not math.isfinite(amount) or amount <= 0:
+            raise ValueError(f"amount must be positive, got {amount!r}")
+        memo = data.get('memo')
+        if memo is not None and not isinstance(memo, str):
+            raise ValueError("memo must be a string")
+        return cls(data['tx_hash'], data['chain'], data['wallet'], amount, memo)
+
+class TransferSource:
+    """Source of incoming transfers to the watched ``(network, wallet)`` pairs"""
+
+    async def fetch(self, wallets: list) -> list:
+        raise NotImplementedError
+
+class FakeChainSource(TransferSource):
+    """In-memory chain for tests and local runs: ``send`` a transfer, the next poll sees it"""
+
+    def __init__(self):
+        self.transfers = []
+        self.position = 0
+
+    def send(self, chain: str, wallet: str, amount: float, memo: str = None) -> Transfer:
+        transfer = Transfer(f"fake-{len(self.transfers):08d}", str(chain), wallet, amount, memo)
+        self.transfers.append(transfer)
+        return transfer
+
+    async def fetch(self, wallets: list) -> list:
+        watched = {(network, wallet_key(wallet)) for network, wallet in wallets}
+        new, self.position = self.transfers[self.position:], len(self.transfers)
+        return [transfer for transfer in new
+                if (payment_network(transfer.chain), wallet_key(transfer.wallet)) in watched]
+
+class HttpTransferSource(TransferSource):
+    """Fetches transfers from an indexer endpoint, resuming from its cursor"""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.cursor = None
+
+    async def fetch(self, wallets: list) -> list:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json={'wallets': wallets, 'cursor': self.cursor})
+            response.raise_for_status()
+            payload = response.json()
+        transfers = []
+        for item in payload.get('transfers', []):
+            try:
+                transfers.append(Transfer.from_dict(item))
+            except ValueError as e:
+                logger.warning("💸 Skipping malformed transfer %r: %s", item, e)
+        self.cursor = payload.get('cursor', self.cursor)
+        return transfers
+
+def create_transfer_source(spec: str):
+    """Create a transfer source from PAYMENT_SOURCE ('fake' or a URL), or None"""
+    if not spec:
+        return None
+    if spec == 'fake':
+        return FakeChainSource()
+    if spec.startswith(('http://', 'https://')):
+        return HttpTransferSource(spec)
+    raise ConfigError(f"Unknown PAYMENT_SOURCE: {spec}")
+
+class PaymentMatcher:
+    """Matches incoming transfers to pending orders by memo, or by a unique quoted amount"""
+
+    # Offset between amounts quoted for the same price, in nano-units
+    OFFSET_STEP = 1_000
+
+    def __init__(self, source: TransferSource = None, ttl: float = PAYMENT_TTL):
+        self.source = source
+        self.ttl = ttl
+        self._by_memo = {}
+        self._by_amount = {}
+        self._wallets = {}
+        self._deadlines = {}
+        self.matched = 0
+        self.unmatched = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._by_memo)
+
+    def _keys(self, order: Order) -> tuple:
+        wallet = (payment_network(order.chain), wallet_key(order.pay_to))
+        return wallet, (*wallet, amount_key(order.amount))
+
+    def quote(self, chain: str, pay_to: str, amount: float) -> float:
+        """Return ``amount`` plus the smallest offset not yet quoted on that receiving wallet"""
+        # Workers share the wallets, so each one takes its own offsets
+        stride, offset = (WORKERS, WORKER_INDEX) if WORKER_INDEX is not None else (1, 0)
+        base = amount_key(amount)
+        wallet = (payment_network(chain), wallet_key(pay_to))
+        while (*wallet, base + offset * self.OFFSET_STEP) in self._by_amount:
+            offset += stride
+        return (base + offset * self.OFFSET_STEP) / 1_000_000_000
+
+    def watch(self, order: Order, now: float = None):
+        """Start watching for payment of a pending order, unless it is past its TTL"""
+        if order.amount is None or order.pay_to is None:
+            return
+        now = now or time.time()
+        deadline = (order.order_date or now) + self.ttl
+        if deadline <= now:
+            return
+        wallet, key = self._keys(order)
+        self._deadlines[order.order_id] = deadline
+        self._by_memo[(*key, order.order_id)] = order
+        self._by_amount.setdefault(key, set()).add(order.order_id)
+        self._wallets[wallet] = self._wallets.get(wallet, 0) + 1
+
+    def unwatch(self, order: Order):
+        """Stop watching an order, once paid or otherwise settled"""
+        if order.amount is None or order.pay_to is None:
+            return
+        wallet, key = self._keys(order)
+        if self._by_memo.pop((*key, order.order_id), None) is None:
+            return
+        del self._deadlines[order.order_id]
+        self._by_amount[key].discard(order.order_id)
+        if not self._by_amount[key]:
+            del self._by_amount[key]
+        self._wallets[wallet] -= 1
+        if not self._wallets[wallet]:
+            del self._wallets[wallet]
+
+    def match(self, transfer: Transfer):
+        """Return the pending order ``transfer`` pays, or None"""
+        key = (payment_network(transfer.chain), wallet_key(transfer.wallet), amount_key(transfer.amount))
+        memo = (transfer.memo or '').strip().upper()
+        order = self._by_memo.get((*key, memo))
+        if order is None:
+            candidates = self._by_amount.get(key, ())
+            if len(candidates) == 1:
+                order = self._by_memo[(*key, next(iter(candidates)))]
+        return order
+
+    def expire(self, now: float = None) -> list:
+        """Stop watching orders past their TTL, freeing their amounts; return them"""
+        now = now or time.time()
+        expired = [order for order in self._by_memo.values() if self._deadlines[order.order_id] <= now]
+        for order in expired:
+            self.unwatch(order)
+        self.expired += len(expired)
+        return expired
+
+    async def poll(self) -> list:
+        """Fetch new transfers for every watched wallet; return ``(order, transfer)`` matches, watched until settled"""
+        if self.source is None or not self._wallets:
+            return []
+        transfers = await self.source.fetch([list(wallet) for wallet in self._wallets])
+        matches = []
+        claimed = set()
+        for transfer in transfers:
+            try:
+                order = self.match(transfer)
+            except (TypeError, ValueError) as e:
+                logger.warning("💸 Skipping malformed transfer %s: %s", transfer.tx_hash, e)
+                continue
+            if order is not None and order.order_id in claimed:
+                # A second transfer for an order already paid in this batch
+                order = None
+            if order is None:
+                self.unmatched += 1
+                if WORKER_INDEX is not None:
+                    # Every worker sees every transfer; most belong to other shards
+                    continue
+                logger.warning("💸 Unmatched transfer %s: %s to %s", transfer.tx_hash, transfer.amount, transfer.wallet)
+                continue
+            claimed.add(order.order_id)
+            self.matched += 1
+            matches.append((order, transfer))
+        return matches
+
+    def stats(self) -> dict:
+        return {'pending': len(self), 'wallets': len(self._wallets), 'matched': self.matched,
+                'unmatched': self.unmatched, 'expired': self.expired}
+
+# ==================== MESSAGE TEMPLATES ====================
+
+class TemplateError(ValueError):
+    pass
+
+class Template:
+    """An HTML message compiled once into static segments and typed, escaped slots"""
+
+    SAMPLES = {str: 'x', int: 0, float: 0.0}
+
+    def __init__(self, name: str, source: str, **types):
+        self.name = name
+        self.types = {}
+        self._segments = []
+        self._slots = []
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"template {name!r}: {e}") from None
+        
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                self._segments.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise TemplateError(f"template {name!r}: slot {{{field}}} is not a plain name")
+            if conversion is not None or '{' in spec:
+                raise TemplateError(f"template {name!r}: slot {{{field}}} uses a conversion or nested spec")
+            kind = types.get(field, str)
+            if kind not in self.SAMPLES:
+                raise TemplateError(f"template {name!r}: slot {{{field}}} has unsupported type {kind!r}")
+            try:
+                format(self.SAMPLES[kind], spec)
+            except ValueError as e:
+                raise TemplateError(f"template {name!r}: slot {{{field}:{spec}}} cannot format {kind.__name__}: {e}") from None
+            self.types[field] = kind
+            self._slots.append((len(self._segments), field, kind, spec))
+            self._segments.append(None)
+        
+        unknown = set(types) - set(self.types)
+        if unknown:
+            raise TemplateError(f"template {name!r}: types given for missing slots {sorted(unknown)}")
+
+    def render(self, **values) -> str:
+        segments = self._segments.copy()
+        for index, field, kind, spec in self._slots:
+            segments[index] = html.escape(format(kind(values[field]), spec))
+        return ''.join(segments)
+
+def format_price(price: float, currency: str) -> str:
+    """Quoted amount: three decimals for ETH and BNB, two otherwise"""
+    return f"{price:.3f}" if currency in ('ETH', 'BNB') else f"{price:.2f}"
+
+def format_amount(amount: float, currency: str) -> str:
+    """Amount to pay: the quoted price, with six decimals if it carries a matching offset"""
+    price = format_price(amount, currency)
+    return price if amount_key(float(price)) == amount_key(amount) else f"{amount:.6f}"
+
+WELCOME_TEMPLATE = Template('welcome', """
+<b># Skeleton Trending Boost Bot</b>
+
+@SkeletonTrendingBot  
+Always verify on {verify_trend} and in {lounge_group}  
+
+<code>────────────────────</code>
+
+<b>{date}</b>
+
+/start  {time} ✅
+
+<code>────────────────────</code>
+
+<b>WELCOME TO</b>
+<b>FASTTRACK TRENDING BOOST</b>
+<b>SERVICE</b>
+
+<b>BOOST YOUR TOKEN ON TRENDING IN SECONDS</b>
+
+Welcome to Skeleton Fasttrack Trending listing service!
+This Agent helps you to list your token on {verify_trend} fast and secure.
+
+<b>FREE MASS DM promotion</b> sending to 112k users + 1 SolidSkull NFT free for 24Hours trending orders!
+To avail contact {support_contact}
+
+<i>Let's start and Choose an Option:</i>
+""")
+
+CHAIN_SELECTION_TEMPLATE = Template('chain_selection', """
+<b># Skeleton Trending Boost Bot</b>
+
+@SkeletonTrendingBot  
+Always verify on {verify_trend} and in {lounge_group}  
+
+<code>────────────────────</code>
+
+<b>{date}</b>
+
+/start  {time} ▼
+
+<code>────────────────────</code>
+
+@SkeletonTrendingBot  
+Select the chain your token is on: {time}
+
+<b>Each chain uses its native currency:</b>
+• BSC → BNB
+• Ethereum → ETH
+• Solana → SOL
+• Base → ETH
+• PumpFun → SOL
+• Possumlabs → SOL
+• FourMeme → BNB
+""")
+
+COMMUNITY_TEMPLATE = Template('community', """
+<b>👥 COMMUNITY TRENDING</b>
+
+<code>────────────────────</code>
+
+<i>Community Trending only supports Solana tokens</i>
+
+<b>Pricing (in SOL):</b>
+• 4 Hours: {price_4h} SOL
+• 8 Hours: {price_8h} SOL
+• 12 Hours: {price_12h} SOL
+• 24 Hours: {price_24h} SOL
+
+<code>────────────────────</code>
+
+<b>Community benefits:</b>
+• Promotion in community groups
+• Still includes free NFT
+
+<code>────────────────────</code>
+
+<i>Select duration for Solana:</i>
+""", price_4h=float, price_8h=float, price_12h=float, price_24h=float)
+
+DURATION_MENU_TEMPLATE = Template('duration_menu', """
+<b># TRENDING BOOST SERVICE</b>
+
+<code>────────────────────</code>
+
+<b>Chain:</b> {chain}
+<b>Currency:</b> {currency}
+<b>Network:</b> {network}
+
+<code>────────────────────</code>
+
+<b>Free Mass DM promotion</b> sending to 112k users + 1 SolidSkull NFT free for 24Hours trending orders!
+To avail contact {support_contact}
+
+<b>Select duration:</b>
+""")
+
+PROMOTIONS_TEMPLATE = Template('promotions', """
+<b>📊 ALL PROMOTION OPTIONS</b>
+
+<code>────────────────────</code>
+
+Join our official promotion group to see:
+• All trending services
+• Community promotions
+• NFT minting info
+• Special offers
+• Live updates
+
+<code>────────────────────</code>
+
+<b>Click below to join:</b>
+""")
+
+MINT_NFT_TEMPLATE = Template('mint_nft', """
+<b>💀 MINT SOLIDSKULL NFT</b>
+
+<code>────────────────────</code>
+
+<b>SolidSkull NFT Benefits:</b>
+• Exclusive access to premium channels
+• Priority support
+• Voting rights in ecosystem
+• Royalty sharing (5%)
+• Free with all trending orders!
+
+<code>────────────────────</code>
+
+<b>To mint or learn more:</b>
+Join our NFT community group:
+""")
+
+ORDER_SUMMARY_TEMPLATE = Template('order_summary', """
+<b>✅ ORDER SUMMARY</b>
+
+<code>────────────────────</code>
+
+<b>📋 Order Details:</b>
+• Order ID: <code>{order_id}</code>
+• Chain: {chain}
+• Duration: {duration}
+• Currency: {currency}
+• Amount: {price} {currency}
+
+<b>📝 Token Info:</b>
+• Address: <code>{token_address}...</code>
+• Telegram: {telegram_link}
+• Twitter: {twitter_link}
+
+<code>────────────────────</code>
+
+<b>💰 Payment Information:</b>
+• Send: {price} {currency}
+• To: <code>{wallet}</code>
+• Network: {network}
+• Memo: <code>{order_id}</code>
+
+<code>────────────────────</code>
+
+<b>🎁 Free Bonus:</b>
+• SolidSkull NFT (all orders)
+• Mass DM to 112k users (24h orders)
+
+<code>────────────────────</code>
+
+<b>📞 After Payment:</b>
+1. Send payment screenshot
+2. Contact: {support_contact}
+3. Include Order ID: <code>{order_id}</code>
+4. Go live within 15 minutes!
+
+<b>Support:</b> {support_contact}
+""")
+
+ASK_TOKEN_ADDRESS_TEMPLATE = Template('ask_token_address', """
+<b># Skeleton Trending Boost Bot</b>
+
+<code>────────────────────</code>
+
+<b>Please send your token address:</b> {time}
+
+<code>────────────────────</code>
+
+<b>Chain:</b> {chain}
+<b>Duration:</b> {duration}
+<b>Payment:</b> {price} {currency}
+
+<code>────────────────────</code>
+
+<i>Send your token contract address:</i>
+""")
+
+ASK_TELEGRAM_LINK_TEMPLATE = Template('ask_telegram_link', """
+<b># Skeleton Trending Boost Bot</b>
+
+<code>────────────────────</code>
+
+<b>Token address received ✅</b>
+<code>{token_address}...</code>
+
+<code>────────────────────</code>
+
+<b>Please send the Telegram link:</b> {time}
+
+<i>Format: https://t.me/yourchannel</i>
+<i>Example: https://t.me/pandagenerate</i>
+""")
+
+ASK_TWITTER_LINK_TEMPLATE = Template('ask_twitter_link', """
+<b># Skeleton Trending Boost Bot</b>
+
+<code>────────────────────</code>
+
+<b>Telegram link received ✅</b>
+{telegram_link}
+
+<code>────────────────────</code>
+
+<b>Add your token Twitter [X] Link (optional):</b> {time}
+
+Tokens with X link get posted on Skeletonecosys X Trending!
+
+<i>Send X link or type "skip" to skip:</i>
+<i>Format: @username or full URL</i>
+""")
+
+PAYMENT_RECEIVED_TEMPLATE = Template('payment_received', """
+<b>✅ PAYMENT RECEIVED</b>
+
+<code>────────────────────</code>
+
+<b>Order ID:</b> <code>{order_id}</code>
+
+<code>────────────────────</code>
+
+<i>Your order is paid and going live!</i>
+""")
+
+AWAITING_PAYMENT_TEMPLATE = Template('awaiting_payment', """
+<b>⏳ AWAITING PAYMENT</b>
+
+<code>────────────────────</code>
+
+<b>Order ID:</b> <code>{order_id}</code>
+<b>Contact:</b> {support_contact}
+
+<code>────────────────────</code>
+
+<i>Payments are confirmed automatically within seconds of landing on-chain.
+You'll get a message as soon as yours arrives.</i>
+""")
+
+CONTACT_SUPPORT_TEMPLATE = Template('contact_support', """
+<b>📞 CONTACT SUPPORT</b>
+
+<code>────────────────────</code>
+
+<b>Order ID:</b> <code>{order_id}</code>
+<b>Contact:</b> {support_contact}
+
+<code>────────────────────</code>
+
+<i>Send payment screenshot and order ID to go live!</i>
+""")
+
+ORDER_DETAILS_TEMPLATE = Template('order_details', """
+<b>📋 ORDER {order_id}</b>
+
+<code>────────────────────</code>
+
+• Status: {status}
+• Chain: {chain}
+• Duration: {duration}
+• Token: <code>{token_address}</code>
+• Telegram: {telegram_link}
+• Twitter: {twitter_link}
+• Date: {date}
+""")
+
+ORDER_PAID_NOTICE_TEMPLATE = Template('order_paid_notice',
+    "<b>✅ PAYMENT RECEIVED</b>\n\nOrder <code>{order_id}</code> is paid and going live!")
+
+ORDER_REJECTED_NOTICE_TEMPLATE = Template('order_rejected_notice',
+    "<b>❌ ORDER REJECTED</b>\n\nOrder <code>{order_id}</code> was rejected.\n"
+    "Contact {support_contact} if you think this is a mistake.")
+
+# ==================== ADMIN NOTIFICATIONS ====================
+
+class AdminDigest:
+    """Order events queued in memory and sent to the admin chat in batches"""
+
+    EVENTS = {
+        'new': "🆕 new",
+        'payment_sent': "💳 payment sent",
+        'paid': "✅ paid on-chain",
+    }
+
+    def __init__(self, chat_id: int = None, per_message: int = 20, max_pending: int = 10000):
+        self.chat_id = chat_id
+        self.per_message = per_message
+        self.max_pending = max_pending
+        # order_id -> (order, [event, ...]) in arrival order
+        self._pending = OrderedDict()
+        self.sent = 0
+        self.dropped = 0
+
+    def add(self, order: Order, event: str):
+        if self.chat_id is None:
+            return
+        if WORKER_INDEX is not None:
+            bot.shared.push_digest_event(order.order_id, event, order.to_dict())
+            return
+        self._queue(order, event)
+
+    def collect(self, events: list):
+        """Queue ``(order_id, event, order)`` events other workers pushed to the shared backend"""
+        for order_id, event, data in events:
+            # The published order is at least as recent as the event's snapshot
+            self._queue(Order.from_dict(bot.shared.fetch_order(order_id) or data), event)
+
+    def _queue(self, order: Order, event: str):
+        entry = self._pending.get(order.order_id)
+        if entry is None:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[order.order_id] = (order, [event])
+        elif event not in entry[1]:
+            entry[1].append(event)
+
+    def drain(self) -> list:
+        """Take every queued order as ``[(order, events), ...]``"""
+        entries = list(self._pending.values())
+        self._pending.clear()
+        return entries
+
+    def format_line(self, order: Order, events: list) -> str:
+        chain_info = bot.chains.get(order.chain, bot.chains['sol'])
+        duration = order.duration.label if order.duration else 'N/A'
+        amount = f"{format_amount(order.amount, chain_info['currency'])} {chain_info['currency']}" if order.amount is not None else 'N/A'
+        return (f"<code>{order.order_id}</code> {', '.join(self.EVENTS[event] for event in events)}\n"
+                f"    {chain_info['name']} • {duration} • {amount} • user <code>{order.user_id}</code>")
+
+    def build_messages(self, entries: list) -> list:
+        """Render entries as ``[(text, keyboard), ...]``, ``per_message`` orders each"""
+        messages = []
+        for start in range(0, len(entries), self.per_message):
+            chunk = entries[start:start + self.per_message]
+            lines = [f"<b>📬 ORDER DIGEST</b> ({len(chunk)} orders)", ""]
+            buttons = []
+            for order, events in chunk:
+                lines.append(self.format_line(order, events))
+                if order.status == OrderStatus.PENDING:
+                    short_id = order.order_id[-6:]
+                    buttons.append([
+                        InlineKeyboardButton(f"✅ Paid …{short_id}", callback_data=callback_data('admin_paid', order.order_id)),
+                        InlineKeyboardButton(f"❌ Reject …{short_id}", callback_data=callback_data('admin_reject', order.order_id)),
+                    ])
+            messages.append(('\n'.join(lines), InlineKeyboardMarkup(buttons) if buttons else None))
+        return messages
+
+    def stats(self) -> dict:
+        return {'enabled': self.chat_id is not None, 'pending': len(self._pending),
+                'sent': self.sent, 'dropped': self.dropped}
+
+admin_digest = AdminDigest(ADMIN_CHAT_ID)
+
+# ==================== SCREEN CACHE ====================
+
+class ScreenCache:
+    """Pre-rendered (text, keyboard) screens, built once and reused"""
+
+    def __init__(self):
+        self._builders = {}
+        self._screens = {}
+
+    def register(self, key: str, builder, timestamped: bool = False):
+        """Register a screen builder"""
+        self._builders[key] = (builder, timestamped)
+        self._screens.pop(key, None)
+
+    def get(self, key: str) -> tuple:
+        """Return the cached ``(text, keyboard)`` pair for a screen"""
+        builder, timestamped = self._builders[key]
+        bucket = int(time.time() // 60) if timestamped else 0
+        entry = self._screens.get(key)
+        if entry is None or entry[0] != bucket:
+            if timestamped:
+                screen = builder(datetime.fromtimestamp(bucket * 60))
+            else:
+                screen = builder()
+            entry = (bucket, screen)
+            self._screens[key] = entry
+        return entry[1]
+
+    def invalidate(self, key: str = None):
+        """Drop one cached screen, or all of them"""
+        if key is None:
+            self._screens.clear()
+        else:
+            self._screens.pop(key, None)
+
+# ==================== MESSAGE CACHE ====================
+
+class MessageContentCache:
+    """What each recent bot message shows, and which queries were answered, in bounded LRU maps"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._content = OrderedDict()
+        self._answered = OrderedDict()
+        self.skipped_edits = 0
+        self.deduped_answers = 0
+
+    @staticmethod
+    def digest(text: str, keyboard: InlineKeyboardMarkup = None) -> int:
+        # Keyboards hash and compare by their buttons
+        return hash((text, keyboard))
+
+    def _remember(self, entries: OrderedDict, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def shows(self, key: tuple, digest: int) -> bool:
+        return self._content.get(key) == digest
+
+    def remember(self, key: tuple, digest: int):
+        self._remember(self._content, key, digest)
+
+    def claim_answer(self, query_id: str) -> bool:
+        """True the first time a callback query is answered, False after"""
+        if query_id in self._answered:
+            self.deduped_answers += 1
+            return False
+        self._remember(self._answered, query_id, True)
+        return True
+
+    def stats(self) -> dict:
+        return {'messages': len(self._content), 'skipped_edits': self.skipped_edits,
+                'deduped_answers': self.deduped_answers}
+
+message_cache = MessageContentCache(MESSAGE_CACHE_SIZE)
+
+def message_key(message) -> tuple:
+    return (message.chat_id, message.message_id)
+
+async def send_screen(message, text: str, keyboard: InlineKeyboardMarkup = None):
+    """Reply with a screen and remember what the new message shows"""
+    sent = await message.reply_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+    if sent is not None:
+        message_cache.remember(message_key(sent), message_cache.digest(text, keyboard))
+    return sent
+
+async def edit_screen(query, text: str, keyboard: InlineKeyboardMarkup = None):
+    """Show a screen in the query's message, unless it already shows exactly that"""
+    key = message_key(query.message) if query.message else None
+    digest = message_cache.digest(text, keyboard)
+    if key is not None and message_cache.shows(key, digest):
+        message_cache.skipped_edits += 1
+        return
+    try:
+        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+    except BadRequest as e:
+        # Shown before this cache saw it, e.g. sent by an earlier process
+        if 'not modified' not in e.message.lower():
+            raise
+        message_cache.skipped_edits += 1
+    if key is not None:
+        message_cache.remember(key, digest)
+
+async def answer_query(query, text: str = None, show_alert: bool = False):
+    """Answer a callback query once; later answers for the same query are dropped"""
+    if message_cache.claim_answer(query.id):
+        await query.answer(text, show_alert=show_alert)
+
+# ==================== PERSISTENCE ====================
+
+class OrderStore:
+    """Durable backend for orders and profiles; the base class keeps nothing"""
+
+    def load(self, since: float = 0) -> tuple:
+        """Return ``(orders, user_data)`` touched at or after ``since``, as dicts"""
+        return {}, {}
+
+    def fetch_order(self, user_id: int):
+        """Return one archived order as a dict, or None"""
+        return None
+
+    def fetch_user(self, user_id: int):
+        """Return one archived user profile as a dict, or None"""
+        return None
+
+    def save_order(self, user_id: int, order: dict):
+        pass
+
+    def save_user(self, user_id: int, profile: dict):
+        pass
+
+    def delete_order(self, user_id: int):
+        pass
+
+    def load_submitted(self) -> dict:
+        """Return all submitted orders as ``{order_id: dict}``"""
+        return {}
+
+    def fetch_submitted(self, order_id: str):
+        """Return one submitted order as a dict, or None"""
+        return None
+
+    def save_submitted(self, order_id: str, order: dict):
+        pass
+
+    def load_conversations(self, since: float = 0) -> dict:
+        """Return conversation states touched at or after ``since`` as ``{name: {key: state}}``"""
+        return {}
+
+    def save_conversation(self, name: str, key: tuple, state):
+        """Save a conversation state; None deletes it"""
+        pass
+
+    def load_user_state(self, since: float = 0) -> dict:
+        """Return PTB ``user_data`` touched at or after ``since`` as ``{user_id: dict}``"""
+        return {}
+
+    def save_user_state(self, user_id: int, data: dict):
+        """Save a user's PTB ``user_data``; an empty dict deletes it"""
+        pass
+
+    def load_bot_state(self) -> dict:
+        return {}
+
+    def save_bot_state(self, data: dict):
+        pass
+
+    def close(self):
+        pass
+
+class SQLiteStore(OrderStore):
+    """SQLite (WAL mode) store with a group-committing writer thread"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS submitted (order_id TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS conversations (key TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS user_state (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS bot_state (name TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS orders_touched ON orders (touched);
+        CREATE INDEX IF NOT EXISTS users_touched ON users (touched);
+        CREATE INDEX IF NOT EXISTS conversations_touched ON conversations (touched);
+        CREATE INDEX IF NOT EXISTS user_state_touched ON user_state (touched);
+    """
+
+    # Primary key column of each table
+    _KEYS = {'orders': 'user_id', 'users': 'user_id', 'submitted': 'order_id',
+             'conversations': 'key', 'user_state': 'user_id', 'bot_state': 'name'}
+
+    # Marks a queued deletion in the unflushed map
+    _DELETED = object()
 
-# Bot Configuration
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-if not BOT_TOKEN:
-    logger.error("❌ BOT_TOKEN environment variable not set!")
-    logger.error("Please set BOT_TOKEN in Render environment variables")
-    # Don't crash - just warn, but bot won't work without token
+    # Failed batches are retried with exponential backoff; at shutdown only this many times
+    MAX_RETRY_DELAY = 5.0
+    SHUTDOWN_RETRIES = 5
 
-# Flask Port Configuration
-PORT = int(os.environ.get('PORT', 10000))
+    def __init__(self, path: str, flush_interval: float = 0.005):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._unflushed = {}
+        self._lock = threading.Lock()
+        self._reader = None
+        self._writer = None
 
-# External links
-COMMUNITY_GROUP_LINK = os.getenv("COMMUNITY_GROUP_LINK", "https://t.me/YourCommunityGroup")
-NFT_MINTING_GROUP_LINK = os.getenv("NFT_MINTING_GROUP_LINK", "https://t.me/YourNFTGroup")
-PROMOTION_GROUP_LINK = os.getenv("PROMOTION_GROUP_LINK", "https://t.me/YourPromotionGroup")
-VERIFY_TREND_LINK = os.getenv("VERIFY_TREND_LINK", "https://t.me/skeletontrend")
-LOUNGE_GROUP_LINK = os.getenv("LOUNGE_GROUP_LINK", "https://t.me/skeletonlounge")
-SUPPORT_CONTACT = os.getenv("SUPPORT_CONTACT", "@skeletondev")
+        conn = self._connect()
+        conn.executescript(self._SCHEMA)
+        conn.close()
 
-# ==================== BOT CONFIGURATION ====================
+    def _connect(self) -> sqlite3.Connection:
+        # Each connection is used by one thread at a time, but closed from another
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
 
-# Conversation states
-MAIN_MENU, SELECT_CHAIN, SELECT_DURATION, TOKEN_ADDRESS, TELEGRAM_LINK, TWITTER_LINK = range(6)
+    def load(self, since: float = 0) -> tuple:
+        self._reader = self._connect()
+        orders = {user_id: json.loads(data) for user_id, data in
+                  self._reader.execute("SELECT user_id, data FROM orders WHERE touched >= ?", (since,))}
+        users = {user_id: json.loads(data) for user_id, data in
+                 self._reader.execute("SELECT user_id, data FROM users WHERE touched >= ?", (since,))}
+
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-store-writer", daemon=True)
+        self._writer.start()
+        return orders, users
+
+    def _fetch(self, table: str, key):
+        with self._lock:
+            item = self._unflushed.get((table, key))
+        if item is not None:
+            return None if item is self._DELETED else json.loads(item[0])
+        if self._reader is None:
+            return None
+        row = self._reader.execute(f"SELECT data FROM {table} WHERE {self._KEYS[table]} = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def fetch_order(self, user_id: int):
+        return self._fetch('orders', user_id)
+
+    def fetch_user(self, user_id: int):
+        return self._fetch('users', user_id)
+
+    def _enqueue(self, key: tuple, item):
+        with self._lock:
+            queued = key in self._unflushed
+            self._unflushed[key] = item
+        if not queued:
+            self._queue.put(key)
+
+    def save_order(self, user_id: int, order: dict):
+        self._enqueue(('orders', user_id), (json.dumps(order), time.time()))
+
+    def save_user(self, user_id: int, profile: dict):
+        self._enqueue(('users', user_id), (json.dumps(profile), time.time()))
+
+    def delete_order(self, user_id: int):
+        self._enqueue(('orders', user_id), self._DELETED)
+
+    def load_submitted(self) -> dict:
+        return {order_id: json.loads(data) for order_id, data in
+                self._reader.execute("SELECT order_id, data FROM submitted ORDER BY order_id")}
+
+    def fetch_submitted(self, order_id: str):
+        return self._fetch('submitted', order_id)
+
+    def save_submitted(self, order_id: str, order: dict):
+        self._enqueue(('submitted', order_id), (json.dumps(order), time.time()))
+
+    def load_conversations(self, since: float = 0) -> dict:
+        conversations = {}
+        for key, data in self._reader.execute("SELECT key, data FROM conversations WHERE touched >= ?", (since,)):
+            name, *conversation_key = json.loads(key)
+            conversations.setdefault(name, {})[tuple(conversation_key)] = json.loads(data)
+        return conversations
+
+    def save_conversation(self, name: str, key: tuple, state):
+        row_key = json.dumps([name, *key])
+        if state is None:
+            self._enqueue(('conversations', row_key), self._DELETED)
+        else:
+            self._enqueue(('conversations', row_key), (json.dumps(state), time.time()))
+
+    def load_user_state(self, since: float = 0) -> dict:
+        return {user_id: json.loads(data) for user_id, data in
+                self._reader.execute("SELECT user_id, data FROM user_state WHERE touched >= ?", (since,))}
+
+    def save_user_state(self, user_id: int, data: dict):
+        if data:
+            self._enqueue(('user_state', user_id), (json.dumps(data), time.time()))
+        else:
+            self._enqueue(('user_state', user_id), self._DELETED)
+
+    def load_bot_state(self) -> dict:
+        row = self._reader.execute("SELECT data FROM bot_state WHERE name = 'bot_data'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def save_bot_state(self, data: dict):
+        self._enqueue(('bot_state', 'bot_data'), (json.dumps(data), time.time()))
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        failures = 0
+        while not (stopping and self._queue.empty()):
+            keys = [self._queue.get()]
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    keys.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in keys:
+                stopping = True
+
+            with self._lock:
+                batch = {key: self._unflushed[key] for key in keys if key is not None}
+            if not batch:
+                continue
+
+            try:
+                conn.execute("BEGIN")
+                for (table, key), item in batch.items():
+                    column = self._KEYS[table]
+                    if item is self._DELETED:
+                        conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                    else:
+                        conn.execute(f"INSERT OR REPLACE INTO {table} ({column}, data, touched) VALUES (?, ?, ?)",
+                                     (key, item[0], item[1]))
+                conn.execute("COMMIT")
+                failures = 0
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                failures += 1
+                if not (stopping and failures > self.SHUTDOWN_RETRIES):
+                    # Keep the snapshots and retry the whole batch, e.g. after SQLITE_BUSY
+                    delay = min(self.MAX_RETRY_DELAY, self.flush_interval * 2 ** failures)
+                    logger.error(f"Failed to persist {len(batch)} records, retrying in {delay:.2f}s: {e}")
+                    for key in batch:
+                        self._queue.put(key)
+                    time.sleep(delay)
+                    continue
+                logger.error(f"❌ Dropping {len(batch)} unsaved records at shutdown: {e}")
+
+            # Forget flushed snapshots; requeue keys that changed meanwhile
+            with self._lock:
+                for key, item in batch.items():
+                    if self._unflushed.get(key) is item:
+                        del self._unflushed[key]
+                    else:
+                        self._queue.put(key)
+        conn.close()
+
+def create_store() -> OrderStore:
+    """Create the configured order store backend"""
+    if STORE_BACKEND == 'memory':
+        return OrderStore()
+    if STORE_BACKEND == 'sqlite':
+        return SQLiteStore(STORE_PATH)
+    raise ValueError(f"Unknown STORE_BACKEND: {STORE_BACKEND}")
+
+class StorePersistence(BasePersistence):
+    """PTB persistence for conversation states, ``user_data`` and ``bot_data`` on top of an OrderStore"""
+
+    def __init__(self, store: OrderStore, update_interval: float = 5):
+        super().__init__(store_data=PersistenceInput(chat_data=False, callback_data=False),
+                         update_interval=update_interval)
+        self.store = store
+        self._conversations = None
+        # Last saved user_data/bot_data snapshots, for skipping unchanged ones
+        self._saved_users = {}
+        self._saved_bot_data = None
+
+    async def get_conversations(self, name: str) -> dict:
+        if self._conversations is None:
+            self._conversations = self.store.load_conversations(time.time() - USER_TTL)
+        conversations = self._conversations.pop(name, {})
+        for (chat_id, user_id, *_), state in conversations.items():
+            metrics.conversations.set(user_id, state)
+        return conversations
+
+    async def update_conversation(self, name: str, key: tuple, new_state):
+        self.store.save_conversation(name, key, new_state)
+
+    async def get_user_data(self) -> dict:
+        user_state = self.store.load_user_state(time.time() - USER_TTL)
+        self._saved_users = {user_id: json.dumps(data, sort_keys=True) for user_id, data in user_state.items()}
+        return user_state
+
+    async def update_user_data(self, user_id: int, data: dict):
+        snapshot = json.dumps(data, sort_keys=True) if data else None
+        if snapshot == self._saved_users.get(user_id):
+            return
+        if snapshot is None:
+            del self._saved_users[user_id]
+        else:
+            self._saved_users[user_id] = snapshot
+        self.store.save_user_state(user_id, data)
+
+    async def drop_user_data(self, user_id: int):
+        if self._saved_users.pop(user_id, None) is not None:
+            self.store.save_user_state(user_id, {})
+
+    async def get_bot_data(self) -> dict:
+        data = self.store.load_bot_state()
+        self._saved_bot_data = json.dumps(data, sort_keys=True)
+        return data
+
+    async def update_bot_data(self, data: dict):
+        snapshot = json.dumps(data, sort_keys=True)
+        if snapshot != self._saved_bot_data:
+            self._saved_bot_data = snapshot
+            self.store.save_bot_state(data)
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: dict):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict):
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict):
+        pass
+
+    async def flush(self):
+        # The store's writer thread commits continuously; closing the store drains it
+        pass
+
+class SharedBackend:
+    """State shared by every worker process; the base class only counts"""
+
+    def __init__(self):
+        self._counters = {}
+
+    def publish_order(self, order_id: str, order: dict):
+        pass
+
+    def fetch_order(self, order_id: str):
+        """Return a published order as a dict, or None"""
+        return None
+
+    def incr(self, counter: str, amount: int = 1):
+        self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def counters(self) -> dict:
+        return dict(self._counters)
+
+    def push_digest_event(self, order_id: str, event: str, order: dict):
+        pass
+
+    def take_digest_events(self) -> list:
+        """Remove and return queued ``(order_id, event, order)`` admin digest events, oldest first"""
+        return []
+
+    def close(self):
+        pass
+
+class SQLiteSharedBackend(SharedBackend):
+    """Shared backend in one SQLite file, for workers on the same host"""
+
+    def __init__(self, path: str, flush_interval: float = 0.005):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self._conn = self._connect()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS shared_orders (order_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS digest_events (id INTEGER PRIMARY KEY AUTOINCREMENT, order_id TEXT NOT NULL,
+                                                      event TEXT NOT NULL, data TEXT NOT NULL);
+        """)
+        self._reader = self._connect()
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name='shared-backend-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def publish_order(self, order_id: str, order: dict):
+        self._queue.put(('order', order_id, json.dumps(order)))
+
+    def fetch_order(self, order_id: str):
+        row = self._reader.execute("SELECT data FROM shared_orders WHERE order_id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def incr(self, counter: str, amount: int = 1):
+        self._queue.put(('incr', counter, amount))
+
+    def counters(self) -> dict:
+        return dict(self._reader.execute("SELECT name, value FROM counters").fetchall())
+
+    def push_digest_event(self, order_id: str, event: str, order: dict):
+        self._queue.put(('digest', order_id, event, json.dumps(order)))
+
+    def take_digest_events(self) -> list:
+        with self._reader:
+            rows = self._reader.execute("SELECT id, order_id, event, data FROM digest_events ORDER BY id").fetchall()
+            if rows:
+                # Events pushed meanwhile get larger IDs and wait for the next call
+                self._reader.execute("DELETE FROM digest_events WHERE id <= ?", (rows[-1][0],))
+        return [(order_id, event, json.loads(data)) for _, order_id, event, data in rows]
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            orders, increments, digest_events = {}, {}, []
+            for item in batch:
+                if item is None:
+                    stopping = True
+                elif item[0] == 'order':
+                    orders[item[1]] = item[2]
+                elif item[0] == 'digest':
+                    digest_events.append(item[1:])
+                else:
+                    increments[item[1]] = increments.get(item[1], 0) + item[2]
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO shared_orders (order_id, data) VALUES (?, ?)", orders.items())
+                    self._conn.executemany(
+                        "INSERT INTO counters (name, value) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", increments.items())
+                    self._conn.executemany(
+                        "INSERT INTO digest_events (order_id, event, data) VALUES (?, ?, ?)", digest_events)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Shared backend write failed: {e}")
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._reader.close()
+        self._conn.close()
+
+def create_shared_backend() -> SharedBackend:
+    """A shared SQLite file when running as one of several workers, else the in-process stand-in"""
+    if WORKERS > 1:
+        return SQLiteSharedBackend(SHARED_STORE_PATH)
+    return SharedBackend()
 
 class SkeletonTrendingBot:
     def __init__(self):
-        self.orders = {}
-        self.user_data = {}
+        self.store = OrderStore()
+        self.shared = SharedBackend()
+        # Both maps are kept in least-recently-touched order
+        self.orders = OrderedDict()
+        self.user_data = OrderedDict()
+        # Every submitted order by order ID
+        self.order_index = OrderIndex()
         
         # Chain configurations
         self.chains = {
@@ -113,529 +2715,569 @@ class SkeletonTrendingBot:
             '24_hours': 5.25
         }
         
-        # Calculate all prices
-        self.prices = self.calculate_prices()
+        # Prices follow the configured rate source, if any
+        self.pricing = PricingEngine(
+            self.base_prices,
+            {chain_id: chain_info['conversion_rate'] for chain_id, chain_info in self.chains.items()},
+            source=create_rate_source(RATE_SOURCE),
+            on_change=self.prices_changed
+        )
+        
+        # Pending orders awaiting an on-chain payment
+        self.payments = PaymentMatcher(create_transfer_source(PAYMENT_SOURCE))
+        
+        # Pre-rendered screens
+        self.screens = ScreenCache()
+        self.screens.register('welcome', self.create_welcome_screen, timestamped=True)
+        self.screens.register('chain_selection', self.create_chain_selection, timestamped=True)
+        self.screens.register('community', self.create_community_menu)
+        self.screens.register('all_promotions', self.create_promotions_menu)
+        self.screens.register('mint_nft', self.create_mint_nft_menu)
+        for chain_id in self.chains:
+            self.screens.register(f'duration_menu:{chain_id}', lambda chain_id=chain_id: self.create_duration_selection(chain_id))
         logger.info("✅ Bot initialized successfully")
     
-    def calculate_prices(self):
-        """Calculate prices for all chains"""
-        prices = {}
-        for duration, sol_price in self.base_prices.items():
-            prices[duration] = {}
-            for chain_id, chain_info in self.chains.items():
-                price = sol_price * chain_info['conversion_rate']
-                prices[duration][chain_id] = round(price, 3)
-        return prices
-    
-    def initialize_user(self, user_id: int):
-        """Initialize user data"""
-        if user_id not in self.orders:
-            self.orders[user_id] = {
-                'chain': None,
-                'duration': None,
-                'token_address': None,
-                'telegram_link': None,
-                'twitter_link': None,
-                'order_date': None,
-                'status': 'pending',
-                'order_id': None
-            }
-        
-        if user_id not in self.user_data:
-            self.user_data[user_id] = {
-                'username': '',
-                'orders': 0,
-                'total_spent': 0,
-                'join_date': datetime.now().isoformat()
-            }
+    def prices_changed(self, chains: set):
+        """Drop cached screens that show prices of the given chains"""
+        for chain_id in chains:
+            self.screens.invalidate(f'duration_menu:{chain_id}')
+        if 'sol' in chains:
+            self.screens.invalidate('community')
+        logger.info(f"💱 Prices updated for {', '.join(sorted(chains))}")
     
-    def create_welcome_message(self) -> str:
-        """Create welcome message"""
-        current_date = datetime.now().strftime("%B %d")
-        current_time = datetime.now().strftime("%H:%M")
+    def open_store(self, store: OrderStore):
+        """Switch to a durable store and rebuild recent state from it"""
+        self.store = store
+        orders, users = store.load(since=time.time() - max(ORDER_TTL, USER_TTL))
+        self.orders = OrderedDict(sorted(((user_id, Order.from_dict(data)) for user_id, data in orders.items()),
+                                         key=lambda item: item[1].touched))
+        self.user_data = OrderedDict(sorted(((user_id, UserProfile.from_dict(data)) for user_id, data in users.items()),
+                                            key=lambda item: item[1].touched))
+        self.order_index = OrderIndex()
+        for data in store.load_submitted().values():
+            order = Order.from_dict(data)
+            self.order_index.add(order)
+            if order.status == OrderStatus.PENDING:
+                self.payments.watch(order)
         
-        return f"""
-<b># Skeleton Trending Boost Bot</b>
-
-@SkeletonTrendingBot  
-Always verify on {VERIFY_TREND_LINK} and in {LOUNGE_GROUP_LINK}  
-
-<code>────────────────────</code>
-
-<b>{current_date}</b>
-
-/start  {current_time} ✅
-
-<code>────────────────────</code>
-
-<b>WELCOME TO</b>
-<b>FASTTRACK TRENDING BOOST</b>
-<b>SERVICE</b>
-
-<b>BOOST YOUR TOKEN ON TRENDING IN SECONDS</b>
-
-Welcome to Skeleton Fasttrack Trending listing service!
-This Agent helps you to list your token on {VERIFY_TREND_LINK} fast and secure.
-
-<b>FREE MASS DM promotion</b> sending to 112k users + 1 SolidSkull NFT free for 24Hours trending orders!
-To avail contact {SUPPORT_CONTACT}
-
-<i>Let's start and Choose an Option:</i>
-"""
+        # A submitted order that is still a user's current order must be one object
+        for user_id, order in self.orders.items():
+            if order.order_id in self.order_index:
+                self.orders[user_id] = self.order_index.get(order.order_id)
+        logger.info(f"💾 Loaded {len(self.orders)} orders, {len(self.order_index)} submitted orders "
+                    f"and {len(self.user_data)} users from store")
     
-    def create_main_menu(self) -> InlineKeyboardMarkup:
-        """Create main menu"""
-        keyboard = [
-            [InlineKeyboardButton("🚀 Main Trending Boost", callback_data="main_boost")],
-            [InlineKeyboardButton("👥 Community Trending", callback_data="community_boost")],
-            [InlineKeyboardButton("📊 Check All Promotion Options", callback_data="all_promotions")],
-            [InlineKeyboardButton("💀 Mint SolidSkull NFT", callback_data="mint_nft")]
-        ]
-        return InlineKeyboardMarkup(keyboard)
+    def save_order(self, user_id: int):
+        """Queue the user's current order for persistence"""
+        self.store.save_order(user_id, self.orders[user_id].to_dict())
     
-    def create_chain_selection(self) -> tuple:
-        """Create chain selection menu"""
-        text = f"""
-<b># Skeleton Trending Boost Bot</b>
-
-@SkeletonTrendingBot  
-Always verify on {VERIFY_TREND_LINK} and in {LOUNGE_GROUP_LINK}  
-
-<code>────────────────────</code>
-
-<b>{datetime.now().strftime("%B %d")}</b>
-
-/start  {datetime.now().strftime("%H:%M")} ▼
-
-<code>────────────────────</code>
-
-@SkeletonTrendingBot  
-Select the chain your token is on: {datetime.now().strftime("%H:%M")}
-
-<b>Each chain uses its native currency:</b>
-• BSC → BNB
-• Ethereum → ETH
-• Solana → SOL
-• Base → ETH
-• PumpFun → SOL
-• Possumlabs → SOL
-• FourMeme → BNB
-"""
-        
-        keyboard = [
-            [InlineKeyboardButton(f"{self.chains['bsc']['symbol']} BSC (BNB)", callback_data="chain_bsc")],
-            [InlineKeyboardButton(f"{self.chains['eth']['symbol']} Ethereum (ETH)", callback_data="chain_eth")],
-            [InlineKeyboardButton(f"{self.chains['sol']['symbol']} Solana (SOL)", callback_data="chain_sol")],
-            [InlineKeyboardButton(f"{self.chains['base']['symbol']} Base (ETH)", callback_data="chain_base")],
-            [InlineKeyboardButton(f"{self.chains['pumpfun']['symbol']} PumpFun (SOL)", callback_data="chain_pumpfun")],
-            [InlineKeyboardButton(f"{self.chains['possum']['symbol']} Possumlabs (SOL)", callback_data="chain_possum")],
-            [InlineKeyboardButton(f"{self.chains['fourmeme']['symbol']} FourMeme (BNB)", callback_data="chain_fourmeme")],
-            [InlineKeyboardButton("🔙 Back", callback_data="back_to_menu")]
-        ]
-        
-        return text, InlineKeyboardMarkup(keyboard)
+    def save_user(self, user_id: int):
+        """Queue the user's profile for persistence"""
+        self.store.save_user(user_id, self.user_data[user_id].to_dict())
     
-    def create_order_summary(self, user_id: int) -> tuple:
-        """Create order summary"""
-        user_data = self.orders[user_id]
-        chain_info = self.chains.get(user_data['chain'], self.chains['sol'])
-        duration = user_data['duration'].replace('_', ' ')
-        price = self.prices[user_data['duration']][user_data['chain']]
-        
-        # Generate order ID
-        order_id = f"ORD-{uuid.uuid4().hex[:8].upper()}"
-        user_data['order_id'] = order_id
+    def save_submitted(self, order: Order):
+        """Persist a submitted order under its order ID and publish it to other workers"""
+        data = order.to_dict()
+        self.store.save_submitted(order.order_id, data)
+        self.shared.publish_order(order.order_id, data)
+    
+    def initialize_user(self, user_id: int) -> UserProfile:
+        """Return the user's profile, creating it on first contact"""
+        profile = self.user_data.get(user_id)
+        if profile is not None:
+            self.user_data.move_to_end(user_id)
+            profile.touched = time.time()
+            return profile
         
-        # Format price
-        if chain_info['currency'] in ['ETH', 'BNB']:
-            price_str = f"{price:.3f}"
+        data = self.store.fetch_user(user_id)
+        if data is not None:
+            profile = UserProfile.from_dict(data)
+            profile.touched = time.time()
         else:
-            price_str = f"{price:.2f}"
-        
-        # Get wallet based on chain
-        wallet_info = self.get_wallet_info(user_data['chain'])
-        
-        text = f"""
-<b>✅ ORDER SUMMARY</b>
-
-<code>────────────────────</code>
-
-<b>📋 Order Details:</b>
-• Order ID: <code>{order_id}</code>
-• Chain: {chain_info['name']}
-• Duration: {duration}
-• Currency: {chain_info['currency']}
-• Amount: {price_str} {chain_info['currency']}
-
-<b>📝 Token Info:</b>
-• Address: <code>{user_data['token_address'][:30]}...</code>
-• Telegram: {user_data['telegram_link']}
-• Twitter: {user_data['twitter_link'] or 'Not provided'}
-
-<code>────────────────────</code>
-
-<b>💰 Payment Information:</b>
-• Send: {price_str} {chain_info['currency']}
-• To: <code>{wallet_info['address']}</code>
-• Network: {wallet_info['network']}
-• Memo: <code>{order_id}</code>
-
-<code>────────────────────</code>
-
-<b>🎁 Free Bonus:</b>
-• SolidSkull NFT (all orders)
-• Mass DM to 112k users (24h orders)
-
-<code>────────────────────</code>
-
-<b>📞 After Payment:</b>
-1. Send payment screenshot
-2. Contact: {SUPPORT_CONTACT}
-3. Include Order ID: <code>{order_id}</code>
-4. Go live within 15 minutes!
-
-<b>Support:</b> {SUPPORT_CONTACT}
-"""
-        
-        keyboard = [
-            [InlineKeyboardButton("💳 I've Sent Payment", callback_data="payment_sent")],
-            [InlineKeyboardButton("📞 Contact Support", url=f"https://t.me/{SUPPORT_CONTACT.replace('@', '')}")],
-            [InlineKeyboardButton("🔄 New Order", callback_data="new_order")]
-        ]
+            profile = UserProfile()
+            self.shared.incr('users')
+        self.user_data[user_id] = profile
+        self.save_user(user_id)
         
-        return text, InlineKeyboardMarkup(keyboard)
+        if len(self.user_data) > MAX_CACHED_USERS:
+            self.evict_lru()
+        return profile
     
-    def get_wallet_info(self, chain_id: str) -> dict:
-        """Get wallet information for chain"""
-        wallets = {
-            'bsc': {
-                'address': os.getenv("BSC_WALLET", "0xYourBNBWalletAddress"),
-                'network': 'Binance Smart Chain (BEP20)'
-            },
-            'eth': {
-                'address': os.getenv("ETH_WALLET", "0xYourETHWalletAddress"),
-                'network': 'Ethereum (ERC20)'
-            },
-            'sol': {
-                'address': os.getenv("SOL_WALLET", "YourSolanaWalletAddress"),
-                'network': 'Solana'
-            },
-            'base': {
-                'address': os.getenv("BASE_WALLET", "0xYourBaseWalletAddress"),
-                'network': 'Base Network'
-            },
-            'pumpfun': {
-                'address': os.getenv("PUMPFUN_WALLET", "YourSolanaWalletAddress"),
-                'network': 'Solana'
-            },
-            'possum': {
-                'address': os.getenv("POSSUM_WALLET", "YourSolanaWalletAddress"),
-                'network': 'Solana'
-            },
-            'fourmeme': {
-                'address': os.getenv("FOURMEME_WALLET", "0xYourBNBWalletAddress"),
-                'network': 'Binance Smart Chain (BEP20)'
-            }
-        }
-        return wallets.get(chain_id, wallets['sol'])
-
-# Initialize bot
-bot = SkeletonTrendingBot()
-
-# ==================== TELEGRAM BOT HANDLERS ====================
-
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /start command"""
-    user_id = update.effective_user.id
-    user = update.effective_user
+    def get_order(self, user_id: int) -> Order:
+        """Return the user's current order, creating an empty one if needed"""
+        order = self.orders.get(user_id)
+        if order is None:
+            data = self.store.fetch_order(user_id)
+            if data is None:
+                order = Order(user_id)
+            else:
+                order = self.order_index.get(data.get('order_id')) or Order.from_dict(data)
+            self.orders[user_id] = order
+        else:
+            self.orders.move_to_end(user_id)
+        order.touched = time.time()
+        return order
     
-    logger.info(f"👤 User {user_id} ({user.username}) started bot")
+    def draft_order(self, user_id: int) -> Order:
+        """Return the user's unsubmitted order, starting a new one if the current one was submitted"""
+        order = self.get_order(user_id)
+        if order.order_id is not None:
+            order = self.reset_order(user_id)
+        return order
     
-    bot.initialize_user(user_id)
-    bot.user_data[user_id]['username'] = user.username or user.first_name
+    def reset_order(self, user_id: int) -> Order:
+        """Start a new, empty order for the user"""
+        order = self.orders[user_id] = Order(user_id)
+        self.orders.move_to_end(user_id)
+        self.save_order(user_id)
+        return order
     
-    welcome_text = bot.create_welcome_message()
+    def submit_order(self, user_id: int, idempotency_key: str = None) -> Order:
+        """Assign an order ID to the user's current order and index it, once per idempotency key"""
+        order = self.orders[user_id]
+        if order.submitted_for(idempotency_key):
+            return order
+        order.order_id = new_order_id(self.order_index)
+        order.idempotency_key = idempotency_key
+        self.order_index.add(order)
+        self.payments.watch(order)
+        admin_digest.add(order, 'new')
+        
+        profile = self.initialize_user(user_id)
+        profile.order_ids += (order.order_id,)
+        profile.orders += 1
+        
+        self.save_order(user_id)
+        self.save_user(user_id)
+        self.save_submitted(order)
+        self.shared.incr('orders_submitted')
+        return order
     
-    await update.message.reply_text(
-        welcome_text,
-        parse_mode=ParseMode.HTML,
-        reply_markup=bot.create_main_menu()
-    )
+    def set_order_status(self, order: Order, status: OrderStatus):
+        """Change a submitted order's status and persist it"""
+        if status != OrderStatus.PENDING:
+            self.payments.unwatch(order)
+        self.order_index.set_status(order, status)
+        self.save_submitted(order)
+        self.shared.incr(f'orders_{status}')
     
-    return MAIN_MENU
-
-async def handle_button_press(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle all button presses"""
-    query = update.callback_query
-    await query.answer()
+    def find_order(self, order_id: str):
+        """Look up a submitted order by ID, or return None"""
+        order = self.order_index.get(order_id)
+        if order is None:
+            data = self.store.fetch_submitted(order_id)
+            if data is not None:
+                order = Order.from_dict(data)
+                self.order_index.add(order)
+        if order is None:
+            # Owned by another worker: a read-only copy, not indexed here
+            data = self.shared.fetch_order(order_id)
+            if data is not None:
+                order = Order.from_dict(data)
+        return order
     
-    user_id = query.from_user.id
-    bot.initialize_user(user_id)
+    def evict_lru(self):
+        """Move least recently used records out of memory until under the cap"""
+        while len(self.user_data) > MAX_CACHED_USERS:
+            user_id, _ = self.user_data.popitem(last=False)
+            self.orders.pop(user_id, None)
+            metrics.conversations.forget(user_id)
     
-    # ===== MAIN MENU ACTIONS =====
-    if query.data == "main_boost":
-        text, keyboard = bot.create_chain_selection()
-        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
-        return SELECT_CHAIN
+    def evict_stale(self, now: float = None) -> tuple:
+        """Drop abandoned orders and idle users from memory; returns (orders, users) evicted"""
+        now = now or time.time()
+        
+        evicted_orders = 0
+        order_cutoff = now - ORDER_TTL
+        while self.orders:
+            user_id, order = next(iter(self.orders.items()))
+            if order.touched >= order_cutoff:
+                break
+            del self.orders[user_id]
+            if order.order_id is None:
+                self.store.delete_order(user_id)
+                metrics.conversations.forget(user_id)
+            evicted_orders += 1
+        
+        evicted_users = 0
+        user_cutoff = now - USER_TTL
+        while self.user_data:
+            user_id, profile = next(iter(self.user_data.items()))
+            if profile.touched >= user_cutoff:
+                break
+            del self.user_data[user_id]
+            metrics.conversations.forget(user_id)
+            evicted_users += 1
+        
+        return evicted_orders, evicted_users
     
-    elif query.data == "community_boost":
-        # Community trending - Solana only
-        text = f"""
-<b>👥 COMMUNITY TRENDING</b>
-
-<code>────────────────────</code>
-
-<i>Community Trending only supports Solana tokens</i>
-
-<b>Pricing (in SOL):</b>
-• 4 Hours: {bot.base_prices['4_hours']} SOL
-• 8 Hours: {bot.base_prices['8_hours']} SOL
-• 12 Hours: {bot.base_prices['12_hours']} SOL
-• 24 Hours: {bot.base_prices['24_hours']} SOL
-
-<code>────────────────────</code>
-
-<b>Community benefits:</b>
-• Promotion in community groups
-• Still includes free NFT
-
-<code>────────────────────</code>
-
-<i>Select duration for Solana:</i>
-"""
+    def create_welcome_message(self, now: datetime = None) -> str:
+        """Create welcome message"""
+        now = now or datetime.now()
+        return WELCOME_TEMPLATE.render(
+            verify_trend=config.links.verify_trend,
+            lounge_group=config.links.lounge_group,
+            date=now.strftime("%B %d"),
+            time=now.strftime("%H:%M"),
+            support_contact=config.links.support_contact
+        )
+    
+    def create_welcome_screen(self, now: datetime = None) -> tuple:
+        """Create welcome message with main menu"""
+        return self.create_welcome_message(now), self.create_main_menu()
+    
+    def create_main_menu(self) -> InlineKeyboardMarkup:
+        """Create main menu"""
         keyboard = [
-            [InlineKeyboardButton(f"⏱️ 4 Hours - {bot.prices['4_hours']['sol']:.2f} SOL [+ Free NFT]", callback_data="duration_4_hours_community")],
-            [InlineKeyboardButton(f"⏱️ 8 Hours - {bot.prices['8_hours']['sol']:.2f} SOL [+ Free NFT]", callback_data="duration_8_hours_community")],
-            [InlineKeyboardButton(f"⏱️ 12 Hours - {bot.prices['12_hours']['sol']:.2f} SOL [+ Free NFT]", callback_data="duration_12_hours_community")],
-            [InlineKeyboardButton(f"⏱️ 24 Hours - {bot.prices['24_hours']['sol']:.2f} SOL [+Mass Dm & NFT]", callback_data="duration_24_hours_community")],
-            [InlineKeyboardButton("🔙 Back", callback_data="back_to_menu")]
+            [InlineKeyboardButton("🚀 Main Trending Boost", callback_data=callback_data('main'))],
+            [InlineKeyboardButton("👥 Community Trending", callback_data=callback_data('community'))],
+            [InlineKeyboardButton("📊 Check All Promotion Options", callback_data=callback_data('promos'))],
+            [InlineKeyboardButton("💀 Mint SolidSkull NFT", callback_data=callback_data('nft'))]
         ]
-        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=InlineKeyboardMarkup(keyboard))
-        return SELECT_DURATION
+        return InlineKeyboardMarkup(keyboard)
     
-    # ===== CHAIN SELECTION =====
-    elif query.data.startswith("chain_"):
-        chain = query.data.replace("chain_", "")
-        bot.orders[user_id]['chain'] = chain
+    def create_chain_selection(self, now: datetime = None) -> tuple:
+        """Create chain selection menu"""
+        now = now or datetime.now()
+        text = CHAIN_SELECTION_TEMPLATE.render(
+            verify_trend=config.links.verify_trend,
+            lounge_group=config.links.lounge_group,
+            date=now.strftime("%B %d"),
+            time=now.strftime("%H:%M")
+        )
         
-        # Create duration selection
-        chain_info = bot.chains.get(chain, bot.chains['sol'])
-        text = f"""
-<b># TRENDING BOOST SERVICE</b>
-
-<code>────────────────────</code>
-
-<b>Chain:</b> {chain_info['name']}
-<b>Currency:</b> {chain_info['currency']}
-<b>Network:</b> {chain_info['network']}
-
-<code>────────────────────</code>
-
-<b>Free Mass DM promotion</b> sending to 112k users + 1 SolidSkull NFT free for 24Hours trending orders!
-To avail contact {SUPPORT_CONTACT}
-
-<b>Select duration:</b>
-"""
+        keyboard = [
+            [InlineKeyboardButton(f"{self.chains['bsc']['symbol']} BSC (BNB)", callback_data=callback_data('chain', Chain.BSC))],
+            [InlineKeyboardButton(f"{self.chains['eth']['symbol']} Ethereum (ETH)", callback_data=callback_data('chain', Chain.ETH))],
+            [InlineKeyboardButton(f"{self.chains['sol']['symbol']} Solana (SOL)", callback_data=callback_data('chain', Chain.SOL))],
+            [InlineKeyboardButton(f"{self.chains['base']['symbol']} Base (ETH)", callback_data=callback_data('chain', Chain.BASE))],
+            [InlineKeyboardButton(f"{self.chains['pumpfun']['symbol']} PumpFun (SOL)", callback_data=callback_data('chain', Chain.PUMPFUN))],
+            [InlineKeyboardButton(f"{self.chains['possum']['symbol']} Possumlabs (SOL)", callback_data=callback_data('chain', Chain.POSSUM))],
+            [InlineKeyboardButton(f"{self.chains['fourmeme']['symbol']} FourMeme (BNB)", callback_data=callback_data('chain', Chain.FOURMEME))],
+            [InlineKeyboardButton("🔙 Back", callback_data=callback_data('menu'))]
+        ]
+        
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    def create_community_menu(self) -> tuple:
+        """Create community trending menu (Solana only)"""
+        prices = self.pricing.snapshot
+        text = COMMUNITY_TEMPLATE.render(
+            price_4h=self.base_prices['4_hours'],
+            price_8h=self.base_prices['8_hours'],
+            price_12h=self.base_prices['12_hours'],
+            price_24h=self.base_prices['24_hours']
+        )
+        keyboard = [
+            [InlineKeyboardButton(f"⏱️ 4 Hours - {prices.price('4_hours', 'sol'):.2f} SOL [+ Free NFT]", callback_data=callback_data('cdur', Duration.H4))],
+            [InlineKeyboardButton(f"⏱️ 8 Hours - {prices.price('8_hours', 'sol'):.2f} SOL [+ Free NFT]", callback_data=callback_data('cdur', Duration.H8))],
+            [InlineKeyboardButton(f"⏱️ 12 Hours - {prices.price('12_hours', 'sol'):.2f} SOL [+ Free NFT]", callback_data=callback_data('cdur', Duration.H12))],
+            [InlineKeyboardButton(f"⏱️ 24 Hours - {prices.price('24_hours', 'sol'):.2f} SOL [+Mass Dm & NFT]", callback_data=callback_data('cdur', Duration.H24))],
+            [InlineKeyboardButton("🔙 Back", callback_data=callback_data('menu'))]
+        ]
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    def create_duration_selection(self, chain: str) -> tuple:
+        """Create duration selection menu for a chain"""
+        chain_info = self.chains.get(chain, self.chains['sol'])
+        prices = self.pricing.snapshot
+        text = DURATION_MENU_TEMPLATE.render(
+            chain=chain_info['name'],
+            currency=chain_info['currency'],
+            network=chain_info['network'],
+            support_contact=config.links.support_contact
+        )
         
         keyboard = []
         for duration_key, duration_name in [('4_hours', '4 Hours'), ('8_hours', '8 Hours'), 
                                            ('12_hours', '12 Hours'), ('24_hours', '24 Hours')]:
-            price = bot.prices[duration_key][chain]
             currency = chain_info['currency']
-            
-            # Format price
-            if currency in ['ETH', 'BNB']:
-                price_str = f"{price:.3f}"
-            else:
-                price_str = f"{price:.2f}"
+            price_str = format_price(prices.price(duration_key, chain), currency)
             
             if duration_key == '24_hours':
                 button_text = f"⏱️ {duration_name} - {price_str} {currency} [+Mass Dm & NFT]"
             else:
                 button_text = f"⏱️ {duration_name} - {price_str} {currency} [+ Free NFT]"
             
-            keyboard.append([InlineKeyboardButton(button_text, callback_data=f"duration_{duration_key}")])
+            keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data('dur', duration_key))])
         
-        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="back_to_chains")])
+        keyboard.append([InlineKeyboardButton("🔙 Back", callback_data=callback_data('chains'))])
         
-        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=InlineKeyboardMarkup(keyboard))
-        return SELECT_DURATION
+        return text, InlineKeyboardMarkup(keyboard)
     
-    # ===== DURATION SELECTION =====
-    elif query.data.startswith("duration_"):
-        if "_community" in query.data:
-            duration = query.data.replace("duration_", "").replace("_community", "")
-            bot.orders[user_id]['chain'] = 'sol'  # Community is Solana only
-        else:
-            duration = query.data.replace("duration_", "")
+    def create_promotions_menu(self) -> tuple:
+        """Create all promotion options menu"""
+        text = PROMOTIONS_TEMPLATE.render()
+        keyboard = [
+            [InlineKeyboardButton("🎯 Join Promotion Group", url=config.links.promotion_group)],
+            [InlineKeyboardButton("🔙 Back", callback_data=callback_data('menu'))]
+        ]
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    def create_mint_nft_menu(self) -> tuple:
+        """Create SolidSkull NFT menu"""
+        text = MINT_NFT_TEMPLATE.render()
+        keyboard = [
+            [InlineKeyboardButton("💀 Join NFT Group", url=config.links.nft_group)],
+            [InlineKeyboardButton("🔙 Back", callback_data=callback_data('menu'))]
+        ]
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    def create_order_summary(self, user_id: int, idempotency_key: str = None) -> tuple:
+        """Submit the user's order and create its summary"""
+        order = self.orders[user_id]
+        chain_info = self.chains.get(order.chain, self.chains['sol'])
+        duration = order.duration.label
+        
+        # Get wallet based on chain
+        wallet = config.wallet(order.chain)
         
-        bot.orders[user_id]['duration'] = duration
+        # Generate order ID; payments are matched against the quoted amount,
+        # which is unique among this wallet's pending orders.
+        # A redelivered request shows its order again, without requoting it
+        if not order.submitted_for(idempotency_key):
+            price = float(format_price(self.pricing.snapshot.price(order.duration, order.chain), chain_info['currency']))
+            order.amount = self.payments.quote(order.chain, wallet.address, price)
+            order.pay_to = wallet.address
+            self.submit_order(user_id, idempotency_key)
+        price_str = format_amount(order.amount, chain_info['currency'])
+        order_id = order.order_id
         
-        # Ask for token address
-        chain_info = bot.chains.get(bot.orders[user_id]['chain'], bot.chains['sol'])
-        price = bot.prices[duration][bot.orders[user_id]['chain']]
-        currency = chain_info['currency']
+        text = ORDER_SUMMARY_TEMPLATE.render(
+            order_id=order_id,
+            chain=chain_info['name'],
+            duration=duration,
+            currency=chain_info['currency'],
+            price=price_str,
+            token_address=order.token_address[:30],
+            telegram_link=order.telegram_link,
+            twitter_link=order.twitter_link or 'Not provided',
+            wallet=order.pay_to,
+            network=wallet.network,
+            support_contact=config.links.support_contact
+        )
         
-        text = f"""
-<b># Skeleton Trending Boost Bot</b>
+        keyboard = [
+            [InlineKeyboardButton("💳 I've Sent Payment", callback_data=callback_data('paid', order_id))],
+            [InlineKeyboardButton("📞 Contact Support", url=config.links.support_url)],
+            [InlineKeyboardButton("🔄 New Order", callback_data=callback_data('new'))]
+        ]
+        
+        return text, InlineKeyboardMarkup(keyboard)
 
-<code>────────────────────</code>
+# Initialize bot
+bot = SkeletonTrendingBot()
 
-<b>Please send your token address:</b> {datetime.now().strftime("%H:%M")}
+# ==================== TELEGRAM BOT HANDLERS ====================
 
-<code>────────────────────</code>
+@instrumented
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /start command"""
+    user_id = update.effective_user.id
+    user = update.effective_user
+    
+    logger.info("👤 User %s (%s) started bot", user_id, user.username, extra={'category': 'start'})
+    
+    profile = bot.initialize_user(user_id)
+    profile.username = user.username or user.first_name
+    bot.save_user(user_id)
+    
+    welcome_text, keyboard = bot.screens.get('welcome')
+    
+    await send_screen(update.message, welcome_text, keyboard)
+    
+    return MAIN_MENU
 
-<b>Chain:</b> {chain_info['name']}
-<b>Duration:</b> {duration.replace('_', ' ')}
-<b>Payment:</b> {price:.3f if currency in ['ETH', 'BNB'] else price:.2f} {currency}
+# ===== MAIN MENU ACTIONS =====
 
-<code>────────────────────</code>
+@router.route('main')
+async def on_main_boost(query, user_id: int, arg):
+    text, keyboard = bot.screens.get('chain_selection')
+    await edit_screen(query, text, keyboard)
+    return SELECT_CHAIN
 
-<i>Send your token contract address:</i>
-"""
-        await query.edit_message_text(text, parse_mode=ParseMode.HTML)
-        return TOKEN_ADDRESS
-    
-    # ===== ORDER COMPLETION =====
-    elif query.data == "payment_sent":
-        order_id = bot.orders[user_id].get('order_id', 'N/A')
-        await query.answer(f"✅ Payment confirmed! Order ID: {order_id}\nContact {SUPPORT_CONTACT} with screenshot.", show_alert=True)
-        
-        text = f"""
-<b>📞 CONTACT SUPPORT</b>
+@router.route('community')
+async def on_community_boost(query, user_id: int, arg):
+    # Community trending - Solana only
+    text, keyboard = bot.screens.get('community')
+    await edit_screen(query, text, keyboard)
+    return SELECT_DURATION
 
-<code>────────────────────</code>
+# ===== CHAIN SELECTION =====
 
-<b>Order ID:</b> <code>{order_id}</code>
-<b>Contact:</b> {SUPPORT_CONTACT}
+@router.route('chain', Chain)
+async def on_chain(query, user_id: int, chain: Chain):
+    bot.draft_order(user_id).chain = chain
+    bot.save_order(user_id)
+    
+    # Create duration selection
+    text, keyboard = bot.screens.get(f'duration_menu:{chain}')
+    await edit_screen(query, text, keyboard)
+    return SELECT_DURATION
 
-<code>────────────────────</code>
+# ===== DURATION SELECTION =====
 
-<i>Send payment screenshot and order ID to go live!</i>
-"""
-        await query.edit_message_text(
-            text,
-            parse_mode=ParseMode.HTML,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("📱 Message Support", url=f"https://t.me/{SUPPORT_CONTACT.replace('@', '')}")],
-                [InlineKeyboardButton("🏠 Main Menu", callback_data="back_to_menu")]
-            ])
-        )
-    
-    # ===== NAVIGATION =====
-    elif query.data == "back_to_menu":
-        welcome_text = bot.create_welcome_message()
-        await query.edit_message_text(welcome_text, parse_mode=ParseMode.HTML, reply_markup=bot.create_main_menu())
-        return MAIN_MENU
-    
-    elif query.data == "back_to_chains":
-        text, keyboard = bot.create_chain_selection()
-        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+@router.route('cdur', Duration)
+async def on_community_duration(query, user_id: int, duration: Duration):
+    bot.draft_order(user_id).chain = Chain.SOL  # Community is Solana only
+    return await on_duration(query, user_id, duration)
+
+@router.route('dur', Duration)
+async def on_duration(query, user_id: int, duration: Duration):
+    order = bot.draft_order(user_id)
+    if order.chain is None:
+        # The order expired while the duration menu was open
+        text, keyboard = bot.screens.get('chain_selection')
+        await edit_screen(query, text, keyboard)
         return SELECT_CHAIN
+    order.duration = duration
+    bot.save_order(user_id)
     
-    elif query.data == "new_order":
-        # Reset user order
-        bot.orders[user_id] = {
-            'chain': None,
-            'duration': None,
-            'token_address': None,
-            'telegram_link': None,
-            'twitter_link': None,
-            'order_date': None,
-            'status': 'pending',
-            'order_id': None
-        }
-        
-        text, keyboard = bot.create_chain_selection()
-        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
-        return SELECT_CHAIN
+    # Ask for token address
+    chain_info = bot.chains.get(order.chain, bot.chains['sol'])
+    currency = chain_info['currency']
     
-    # ===== OTHER MENUS =====
-    elif query.data == "all_promotions":
-        text = f"""
-<b>📊 ALL PROMOTION OPTIONS</b>
+    text = ASK_TOKEN_ADDRESS_TEMPLATE.render(
+        time=datetime.now().strftime("%H:%M"),
+        chain=chain_info['name'],
+        duration=duration.label,
+        price=format_price(bot.pricing.snapshot.price(duration, order.chain), currency),
+        currency=currency
+    )
+    await edit_screen(query, text)
+    return TOKEN_ADDRESS
 
-<code>────────────────────</code>
+# ===== ORDER COMPLETION =====
 
-Join our official promotion group to see:
-• All trending services
-• Community promotions
-• NFT minting info
-• Special offers
-• Live updates
+@router.route('paid', str, answer=False)
+async def on_payment_sent(query, user_id: int, order_id: str):
+    # The button belongs to one summary; the user may have started other orders since
+    order = bot.find_order(order_id)
+    if order is None or order.user_id != user_id:
+        await answer_query(query, "❌ Order not found.", show_alert=True)
+        return None
+    if order.status == OrderStatus.PENDING:
+        admin_digest.add(order, 'payment_sent')
+    
+    if bot.payments.source and order.status == OrderStatus.PAID:
+        await answer_query(query, f"✅ Payment received! Order ID: {order_id}", show_alert=True)
+        text = PAYMENT_RECEIVED_TEMPLATE.render(order_id=order_id)
+    elif bot.payments.source:
+        await answer_query(query, f"⏳ Watching for your payment. Order ID: {order_id}", show_alert=True)
+        text = AWAITING_PAYMENT_TEMPLATE.render(order_id=order_id, support_contact=config.links.support_contact)
+    else:
+        await answer_query(query, f"✅ Payment confirmed! Order ID: {order_id}\nContact {config.links.support_contact} with screenshot.", show_alert=True)
+        text = CONTACT_SUPPORT_TEMPLATE.render(order_id=order_id, support_contact=config.links.support_contact)
+    await edit_screen(query, text, InlineKeyboardMarkup([
+        [InlineKeyboardButton("📱 Message Support", url=config.links.support_url)],
+        [InlineKeyboardButton("🏠 Main Menu", callback_data=callback_data('menu'))]
+    ]))
+    return MAIN_MENU
 
-<code>────────────────────</code>
+# ===== STAFF ACTIONS =====
 
-<b>Click below to join:</b>
-"""
-        await query.edit_message_text(
-            text,
-            parse_mode=ParseMode.HTML,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("🎯 Join Promotion Group", url=PROMOTION_GROUP_LINK)],
-                [InlineKeyboardButton("🔙 Back", callback_data="back_to_menu")]
-            ])
-        )
+async def on_admin_order_action(query, user_id: int, order_id: str, status: OrderStatus):
+    if user_id not in ADMIN_USER_IDS:
+        await answer_query(query, "⛔ Staff only.", show_alert=True)
+        return None
     
-    elif query.data == "mint_nft":
-        text = f"""
-<b>💀 MINT SOLIDSKULL NFT</b>
+    order = bot.find_order(order_id)
+    if order is None or order_id not in bot.order_index:
+        await answer_query(query, "❌ Order not found.", show_alert=True)
+        return None
+    
+    if order.status != OrderStatus.PENDING:
+        await answer_query(query, f"Order {order_id} is already {order.status}.")
+    else:
+        bot.set_order_status(order, status)
+        logger.info(f"🛂 Order {order_id} marked {status} by {user_id}")
+        await answer_query(query, f"{'✅' if status == OrderStatus.PAID else '❌'} {order_id} marked {status}.")
+        await notify_order_status(query.get_bot(), order)
+    
+    # The order is settled; drop its buttons from the digest
+    markup = query.message.reply_markup if query.message else None
+    if markup:
+        rows = [row for row in markup.inline_keyboard
+                if not any(order_id in (button.callback_data or '') for button in row)]
+        await query.edit_message_reply_markup(InlineKeyboardMarkup(rows) if rows else None)
+    return None
 
-<code>────────────────────</code>
+@router.route('admin_paid', str, answer=False)
+async def on_admin_mark_paid(query, user_id: int, order_id: str):
+    return await on_admin_order_action(query, user_id, order_id, OrderStatus.PAID)
 
-<b>SolidSkull NFT Benefits:</b>
-• Exclusive access to premium channels
-• Priority support
-• Voting rights in ecosystem
-• Royalty sharing (5%)
-• Free with all trending orders!
+@router.route('admin_reject', str, answer=False)
+async def on_admin_reject(query, user_id: int, order_id: str):
+    return await on_admin_order_action(query, user_id, order_id, OrderStatus.REJECTED)
 
-<code>────────────────────</code>
+# ===== NAVIGATION =====
 
-<b>To mint or learn more:</b>
-Join our NFT community group:
-"""
-        await query.edit_message_text(
-            text,
-            parse_mode=ParseMode.HTML,
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton("💀 Join NFT Group", url=NFT_MINTING_GROUP_LINK)],
-                [InlineKeyboardButton("🔙 Back", callback_data="back_to_menu")]
-            ])
-        )
+@router.route('menu')
+async def on_back_to_menu(query, user_id: int, arg):
+    welcome_text, keyboard = bot.screens.get('welcome')
+    await edit_screen(query, welcome_text, keyboard)
+    return MAIN_MENU
+
+@router.route('chains')
+async def on_back_to_chains(query, user_id: int, arg):
+    text, keyboard = bot.screens.get('chain_selection')
+    await edit_screen(query, text, keyboard)
+    return SELECT_CHAIN
+
+@router.route('new')
+async def on_new_order(query, user_id: int, arg):
+    # Reset user order
+    bot.reset_order(user_id)
     
+    text, keyboard = bot.screens.get('chain_selection')
+    await edit_screen(query, text, keyboard)
+    return SELECT_CHAIN
+
+# ===== OTHER MENUS =====
+
+@router.route('promos')
+async def on_all_promotions(query, user_id: int, arg):
+    text, keyboard = bot.screens.get('all_promotions')
+    await edit_screen(query, text, keyboard)
+    return MAIN_MENU
+
+@router.route('nft')
+async def on_mint_nft(query, user_id: int, arg):
+    text, keyboard = bot.screens.get('mint_nft')
+    await edit_screen(query, text, keyboard)
     return MAIN_MENU
 
+async def restart_expired_order(message) -> int:
+    """Send a user whose unfinished order was evicted back to chain selection"""
+    await message.reply_text("⌛ Your order expired. Please start again by choosing a chain:")
+    text, keyboard = bot.screens.get('chain_selection')
+    await send_screen(message, text, keyboard)
+    return SELECT_CHAIN
+
+@instrumented
 async def handle_token_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle token address input"""
     user_id = update.effective_user.id
     token_address = update.message.text.strip()
+    order = bot.draft_order(user_id)
+    if order.chain is None or order.duration is None:
+        return await restart_expired_order(update.message)
+    chain = order.chain
     
-    if len(token_address) < 10:
-        await update.message.reply_text("❌ Invalid token address. Please send a valid contract address:")
+    error = address_validator.validate(chain, token_address)
+    if error:
+        await update.message.reply_text(f"❌ Invalid {bot.chains[chain]['name']} token address: {error}.\nPlease send a valid contract address:")
         return TOKEN_ADDRESS
     
-    bot.orders[user_id]['token_address'] = token_address
+    order.token_address = token_address
+    bot.save_order(user_id)
     
     # Ask for Telegram link
-    text = f"""
-<b># Skeleton Trending Boost Bot</b>
-
-<code>────────────────────</code>
-
-<b>Token address received ✅</b>
-<code>{token_address[:50]}...</code>
-
-<code>────────────────────</code>
-
-<b>Please send the Telegram link:</b> {datetime.now().strftime("%H:%M")}
-
-<i>Format: https://t.me/yourchannel</i>
-<i>Example: https://t.me/pandagenerate</i>
-"""
+    text = ASK_TELEGRAM_LINK_TEMPLATE.render(token_address=token_address[:50], time=datetime.now().strftime("%H:%M"))
     await update.message.reply_text(text, parse_mode=ParseMode.HTML)
     return TELEGRAM_LINK
 
+@instrumented
 async def handle_telegram_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle Telegram link input"""
     user_id = update.effective_user.id
@@ -645,47 +3287,76 @@ async def handle_telegram_link(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("❌ Invalid Telegram link. Must start with https://t.me/\nPlease send a valid link:")
         return TELEGRAM_LINK
     
-    bot.orders[user_id]['telegram_link'] = telegram_link
+    order = bot.draft_order(user_id)
+    if order.duration is None or order.token_address is None:
+        return await restart_expired_order(update.message)
+    order.telegram_link = telegram_link
+    bot.save_order(user_id)
     
     # Ask for Twitter link (optional)
-    text = f"""
-<b># Skeleton Trending Boost Bot</b>
-
-<code>────────────────────</code>
-
-<b>Telegram link received ✅</b>
-{telegram_link}
-
-<code>────────────────────</code>
-
-<b>Add your token Twitter [X] Link (optional):</b> {datetime.now().strftime("%H:%M")}
-
-Tokens with X link get posted on Skeletonecosys X Trending!
-
-<i>Send X link or type "skip" to skip:</i>
-<i>Format: @username or full URL</i>
-"""
+    text = ASK_TWITTER_LINK_TEMPLATE.render(telegram_link=telegram_link, time=datetime.now().strftime("%H:%M"))
     await update.message.reply_text(text, parse_mode=ParseMode.HTML)
     return TWITTER_LINK
 
+@instrumented
 async def handle_twitter_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle Twitter link input"""
     user_id = update.effective_user.id
     twitter_link = update.message.text.strip()
+    idempotency_key = f"{update.effective_chat.id}:{update.message.message_id}"
     
-    if twitter_link.lower() == 'skip':
-        bot.orders[user_id]['twitter_link'] = None
-    else:
-        bot.orders[user_id]['twitter_link'] = twitter_link
-    
-    bot.orders[user_id]['order_date'] = datetime.now().isoformat()
+    # A redelivered message shows its already submitted order again
+    order = bot.get_order(user_id)
+    if not order.submitted_for(idempotency_key):
+        order = bot.draft_order(user_id)
+        if order.duration is None or order.telegram_link is None:
+            return await restart_expired_order(update.message)
+        if twitter_link.lower() == 'skip':
+            order.twitter_link = None
+        else:
+            order.twitter_link = twitter_link
+        
+        order.order_date = time.time()
+        bot.save_order(user_id)
     
     # Show order summary
-    summary_text, keyboard = bot.create_order_summary(user_id)
-    await update.message.reply_text(summary_text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+    summary_text, keyboard = bot.create_order_summary(user_id, idempotency_key)
+    await send_screen(update.message, summary_text, keyboard)
+    
+    # Stay in the conversation so the summary's buttons keep working
+    return MAIN_MENU
+
+def format_order_details(order: Order) -> str:
+    """Short HTML description of a submitted order"""
+    chain_info = bot.chains.get(order.chain, bot.chains['sol'])
+    order_date = datetime.fromtimestamp(order.order_date).strftime("%Y-%m-%d %H:%M") if order.order_date else 'N/A'
+    return ORDER_DETAILS_TEMPLATE.render(
+        order_id=order.order_id,
+        status=order.status.value.upper(),
+        chain=chain_info['name'],
+        duration=order.duration.label if order.duration else 'N/A',
+        token_address=order.token_address,
+        telegram_link=order.telegram_link,
+        twitter_link=order.twitter_link or 'Not provided',
+        date=order_date
+    )
+
+async def order_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /order <id>"""
+    if not context.args:
+        await update.message.reply_text("Usage: /order ORD-XXXXXXXXXXXXXXXX")
+        return
     
-    return ConversationHandler.END
+    user_id = update.effective_user.id
+    order = bot.find_order(context.args[0].strip().upper())
+    # Users only see their own orders; staff see all
+    if order is None or (order.user_id != user_id and user_id not in ADMIN_USER_IDS):
+        await update.message.reply_text("❌ Order not found.")
+        return
+    
+    await update.message.reply_text(format_order_details(order), parse_mode=ParseMode.HTML)
 
+@instrumented
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle text messages"""
     text = update.message.text.lower()
@@ -695,153 +3366,806 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return MAIN_MENU
     
     # Default response
-    welcome_text = bot.create_welcome_message()
-    await update.message.reply_text(welcome_text, parse_mode=ParseMode.HTML, reply_markup=bot.create_main_menu())
+    welcome_text, keyboard = bot.screens.get('welcome')
+    await send_screen(update.message, welcome_text, keyboard)
     return MAIN_MENU
 
+async def evict_stale_job(context: ContextTypes.DEFAULT_TYPE):
+    """Periodically drop abandoned orders and idle users from memory"""
+    evicted_orders, evicted_users = bot.evict_stale()
+    if evicted_orders or evicted_users:
+        logger.info(f"🧹 Evicted {evicted_orders} stale orders and {evicted_users} idle users")
+
+async def refresh_prices_job(context: ContextTypes.DEFAULT_TYPE):
+    """Refresh conversion rates from the configured rate source"""
+    try:
+        await bot.pricing.refresh()
+    except Exception as e:
+        logger.error(f"Failed to refresh conversion rates: {e}")
+
+async def notify_order_status(telegram_bot, order: Order):
+    """Tell the buyer their order was marked paid or rejected"""
+    if order.status == OrderStatus.PAID:
+        text = ORDER_PAID_NOTICE_TEMPLATE.render(order_id=order.order_id)
+    else:
+        text = ORDER_REJECTED_NOTICE_TEMPLATE.render(order_id=order.order_id, support_contact=config.links.support_contact)
+    try:
+        await telegram_bot.send_message(chat_id=order.user_id, text=text, parse_mode=ParseMode.HTML,
+                                        rate_limit_args=PRIORITY_NOTICE)
+    except Exception as e:
+        logger.error(f"Failed to notify user {order.user_id} about order {order.order_id}: {e}")
+
+async def match_payments_job(context: ContextTypes.DEFAULT_TYPE):
+    """Mark pending orders paid as their transfers arrive"""
+    for order in bot.payments.expire():
+        logger.info("⌛ Order %s unpaid after %.0fh, no longer matching transfers", order.order_id,
+                    bot.payments.ttl / 3600, extra={'category': 'payment'})
+    
+    try:
+        matches = await bot.payments.poll()
+    except Exception as e:
+        logger.error(f"Failed to fetch transfers: {e}")
+        return
+    
+    for order, transfer in matches:
+        bot.set_order_status(order, OrderStatus.PAID)
+        admin_digest.add(order, 'paid')
+        logger.info("💰 Order %s paid by %s", order.order_id, transfer.tx_hash, extra={'category': 'payment'})
+        await notify_order_status(context.bot, order)
+
+async def admin_digest_job(context: ContextTypes.DEFAULT_TYPE):
+    """Send queued order events to the admin chat, a few orders per message"""
+    if WORKER_INDEX is not None:
+        try:
+            admin_digest.collect(bot.shared.take_digest_events())
+        except sqlite3.Error as e:
+            logger.error(f"Failed to collect digest events from other workers: {e}")
+    for text, keyboard in admin_digest.build_messages(admin_digest.drain()):
+        try:
+            await context.bot.send_message(
+                chat_id=admin_digest.chat_id,
+                text=text,
+                parse_mode=ParseMode.HTML,
+                reply_markup=keyboard,
+                rate_limit_args=PRIORITY_NOTICE
+            )
+            admin_digest.sent += 1
+        except Exception as e:
+            logger.error(f"Failed to send admin digest: {e}")
+
+async def watch_config_job(context: ContextTypes.DEFAULT_TYPE):
+    """Reload links and wallets when CONFIG_FILE changes on disk"""
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime
+    except OSError:
+        return
+    previous = context.job.data.get('mtime')
+    context.job.data['mtime'] = mtime
+    if previous is not None and mtime != previous:
+        reload_config()
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors"""
     logger.error(f"Error: {context.error}")
     
+    # Flood control and connectivity errors are transient; answering them
+    # with another message only adds load
+    error = context.error
+    metrics.errors.inc(type(error).__name__)
+    if isinstance(error, RetryAfter) or (isinstance(error, NetworkError) and not isinstance(error, BadRequest)):
+        return
+    
     if update and update.effective_user:
         try:
-            welcome_text = bot.create_welcome_message()
-            await update.effective_user.send_message(
+            welcome_text, keyboard = bot.screens.get('welcome')
+            await context.bot.send_message(
+                update.effective_user.id,
                 welcome_text,
                 parse_mode=ParseMode.HTML,
-                reply_markup=bot.create_main_menu()
+                reply_markup=keyboard,
+                rate_limit_args=PRIORITY_NOTICE
             )
         except Exception as e:
             logger.error(f"Failed to send error message: {e}")
 
-# ==================== FLASK APP FOR HEALTH CHECKS ====================
+# ==================== HEALTH ====================
+
+class ApiConnectivity:
+    """Whether the Bot API is answering, as seen by every HTTP request the bot makes"""
+
+    def __init__(self, max_failures: int = 3):
+        self.max_failures = max_failures
+        self.last_ok = None
+        self.last_failure = None
+        self.last_error = None
+        # Consecutive transport failures or 5xx answers
+        self.failures = 0
+
+    def ok(self):
+        self.last_ok = time.time()
+        self.failures = 0
+
+    def failed(self, error):
+        self.last_failure = time.time()
+        self.last_error = str(error)
+        self.failures += 1
+
+    @property
+    def connected(self) -> bool:
+        return self.last_ok is not None and self.failures < self.max_failures
+
+    def stats(self) -> dict:
+        return {
+            'connected': self.connected,
+            'last_ok': datetime.fromtimestamp(self.last_ok).isoformat() if self.last_ok else None,
+            'consecutive_failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+api_connectivity = ApiConnectivity()
+
+@dataclass(frozen=True)
+class HealthSnapshot:
+    published: float
+    ready: bool
+    body: bytes
+
+class HealthPublisher:
+    """Health state built on the event loop and swapped in as one object"""
+
+    def __init__(self, stale_after: float = 10):
+        self.stale_after = stale_after
+        self.snapshot = None
+
+    @staticmethod
+    def bot_ready() -> bool:
+        application = telegram_app
+        if application is None or not application.running:
+            return False
+        if application.updater is not None and not application.updater.running:
+            return False
+        return api_connectivity.connected
+
+    def collect(self, loop_lag: float) -> dict:
+        ready = self.bot_ready()
+        return {
+            'status': 'healthy' if ready else 'degraded',
+            'ready': ready,
+            'service': 'Skeleton Trending Boost Bot',
+            'timestamp': datetime.now().isoformat(),
+            'loop_lag_ms': round(loop_lag * 1000, 1),
+            'orders_processed': len(bot.order_index),
+            'orders_by_status': {status.value: len(ids) for status, ids in bot.order_index.by_status.items()},
+            'bot_token_set': bool(BOT_TOKEN),
+            'mode': BOT_MODE,
+            'bot_api': api_connectivity.stats(),
+            'outbound': outbound.stats(),
+            'updates': update_processor.stats(),
+            'supervisor': supervisor.stats(),
+            'logging': {'sampled_out': log_handler.filters[0].dropped, 'overflowed': log_handler.overflowed},
+            'payments': bot.payments.stats(),
+            'admin_digest': admin_digest.stats(),
+            'message_cache': message_cache.stats(),
+            'environment': 'production' if os.getenv('RENDER') else 'development'
+        }
+
+    def publish(self, loop_lag: float = 0.0):
+        state = self.collect(loop_lag)
+        self.snapshot = HealthSnapshot(time.monotonic(), state['ready'], json.dumps(state).encode())
 
-flask_app = Flask(__name__)
+    def live(self) -> bool:
+        snapshot = self.snapshot
+        return snapshot is not None and time.monotonic() - snapshot.published < self.stale_after
 
-@flask_app.route('/')
-def home():
-    return "🤖 Skeleton Trending Boost Bot is running!", 200
+health_publisher = HealthPublisher()
 
-@flask_app.route('/health')
-def health():
-    return jsonify({
-        'status': 'healthy',
-        'service': 'Skeleton Trending Boost Bot',
-        'timestamp': datetime.now().isoformat(),
-        'orders_processed': len(bot.orders),
-        'bot_token_set': bool(BOT_TOKEN),
-        'environment': 'production' if os.getenv('RENDER') else 'development'
-    }), 200
+# ==================== WEB SERVER (HEALTH CHECKS + WEBHOOK) ====================
 
-@flask_app.route('/info')
-def info():
-    return jsonify({
+# Running Telegram application, set by run_telegram_bot()
+telegram_app = None
+
+async def home(request: web.Request) -> web.Response:
+    return web.Response(text="🤖 Skeleton Trending Boost Bot is running!")
+
+async def health(request: web.Request) -> web.Response:
+    snapshot = health_publisher.snapshot
+    if snapshot is None:
+        return web.json_response({'status': 'starting'}, status=503)
+    return web.Response(body=snapshot.body, content_type='application/json')
+
+async def livez(request: web.Request) -> web.Response:
+    """Liveness: the event loop is turning and publishing health"""
+    if health_publisher.live():
+        return web.Response(text="ok")
+    return web.Response(status=503, text="stale")
+
+async def readyz(request: web.Request) -> web.Response:
+    """Readiness: the bot is running and the Bot API is answering"""
+    if health_publisher.live() and health_publisher.snapshot.ready:
+        return web.Response(text="ok")
+    return web.Response(status=503, text="not ready")
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    """Prometheus scrape target"""
+    return web.Response(body=metrics.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+async def info(request: web.Request) -> web.Response:
+    return web.json_response({
         'bot': 'Skeleton Trending Boost Bot',
         'version': '2.0',
         'deployment': 'Render',
         'port': PORT,
         'external_links': {
-            'community_group': COMMUNITY_GROUP_LINK,
-            'nft_group': NFT_MINTING_GROUP_LINK,
-            'promotion_group': PROMOTION_GROUP_LINK,
-            'support': SUPPORT_CONTACT
+            'community_group': config.links.community_group,
+            'nft_group': config.links.nft_group,
+            'promotion_group': config.links.promotion_group,
+            'support': config.links.support_contact
         }
-    }), 200
+    })
 
-def run_flask_app():
-    """Run Flask app for health checks"""
-    logger.info(f"Starting Flask app on port {PORT}")
+async def telegram_webhook(request: web.Request) -> web.Response:
+    """Receive a Telegram update and feed it into the application update queue"""
+    if WEBHOOK_SECRET and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != WEBHOOK_SECRET:
+        return web.Response(status=403)
     
-    # Check if running with gunicorn (production)
-    if "gunicorn" in sys.modules:
-        logger.info("Running with gunicorn - skipping manual run")
-        return
+    application = telegram_app
+    if application is None or not application.running:
+        # Telegram retries non-2xx deliveries, so the update is not lost
+        return web.Response(status=503)
+    
+    try:
+        update = Update.de_json(await request.json(), application.bot)
+    except ValueError:
+        return web.Response(status=400)
+    
+    await application.update_queue.put(update)
+    return web.Response()
+
+def check_admin(request: web.Request):
+    """Reject requests without the admin bearer token"""
+    if not ADMIN_TOKEN or not secrets.compare_digest(request.headers.get('Authorization', ''), f"Bearer {ADMIN_TOKEN}"):
+        raise web.HTTPUnauthorized()
+
+async def admin_get_order(request: web.Request) -> web.Response:
+    check_admin(request)
+    order = bot.find_order(request.match_info['order_id'].upper())
+    if order is None:
+        raise web.HTTPNotFound()
+    return web.json_response(order.to_dict())
+
+ADMIN_PAGE_LIMIT = 500
+
+# Order IDs hold 48 bits of milliseconds
+MAX_ORDER_TIMESTAMP = ((1 << 48) - 1) / 1000
+
+def parse_time_param(value: str) -> float:
+    """Parse a Unix timestamp or ISO 8601 datetime query parameter"""
+    try:
+        timestamp = float(value)
+    except ValueError:
+        timestamp = datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(timestamp) or not 0 <= timestamp <= MAX_ORDER_TIMESTAMP:
+        raise ValueError(f"timestamp out of range: {value}")
+    return timestamp
+
+async def admin_list_orders(request: web.Request) -> web.Response:
+    """List submitted orders, filtered and paginated by cursor"""
+    check_admin(request)
+    params = request.query
+    try:
+        status = OrderStatus(params['status']) if 'status' in params else None
+        chain = Chain(params['chain']) if 'chain' in params else None
+        duration = Duration(params['duration']) if 'duration' in params else None
+        since = parse_time_param(params['since']) if 'since' in params else None
+        until = parse_time_param(params['until']) if 'until' in params else None
+        limit = int(params.get('limit', 50))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    if not 1 <= limit <= ADMIN_PAGE_LIMIT:
+        raise web.HTTPBadRequest(text=f"limit must be between 1 and {ADMIN_PAGE_LIMIT}")
+    
+    orders, next_cursor = bot.order_index.query(status=status, chain=chain, duration=duration, since=since,
+                                                until=until, cursor=params.get('cursor', '').upper(), limit=limit)
+    return web.json_response({
+        'orders': [order.to_dict() for order in orders],
+        'next_cursor': next_cursor,
+    })
+
+def create_web_app() -> web.Application:
+    """Create the aiohttp app serving health checks and the webhook"""
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/health', health)
+    app.router.add_get('/livez', livez)
+    app.router.add_get('/readyz', readyz)
+    app.router.add_get('/info', info)
+    app.router.add_get('/metrics', metrics_endpoint)
+    if BOT_MODE == 'webhook':
+        app.router.add_post(WEBHOOK_PATH, telegram_webhook)
+    if ADMIN_TOKEN:
+        app.router.add_get('/admin/orders', admin_list_orders)
+        app.router.add_get('/admin/orders/{order_id}', admin_get_order)
+    return app
+
+async def start_web_server() -> web.AppRunner:
+    """Start the web server on the running event loop"""
+    logger.info(f"Starting web server on port {PORT}")
+    runner = web.AppRunner(create_web_app(), access_log=None)
+    await runner.setup()
+    # Workers only take traffic from the front router
+    await web.TCPSite(runner, host='0.0.0.0' if WORKER_INDEX is None else '127.0.0.1', port=PORT).start()
+    return runner
+
+# ==================== SHARDING ====================
+
+# Update fields carrying the acting user, in Update.effective_user order
+USER_UPDATE_FIELDS = ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'inline_query',
+                      'chosen_inline_result', 'callback_query', 'shipping_query', 'pre_checkout_query',
+                      'poll_answer', 'my_chat_member', 'chat_member', 'chat_join_request')
+
+def update_user_id(payload: dict) -> int:
+    """The acting user's ID in a raw update, or 0 when it has none"""
+    for field in USER_UPDATE_FIELDS:
+        item = payload.get(field)
+        if item:
+            user = item.get('from') or item.get('user') or item.get('chat') or {}
+            return user.get('id', 0)
+    return 0
+
+def shard_for(user_id: int, workers: int) -> int:
+    """Rendezvous hash of a user onto a worker"""
+    best, best_score = 0, b''
+    for worker in range(workers):
+        score = hashlib.blake2b(f"{user_id}:{worker}".encode(), digest_size=8).digest()
+        if score > best_score:
+            best, best_score = worker, score
+    return best
+
+class WorkerPool:
+    """Bot worker processes, restarted with backoff when they exit"""
+
+    def __init__(self, count: int, base_port: int):
+        self.count = count
+        self.base_port = base_port
+        self.processes = [None] * count
+        self.restarts = [0] * count
+        self._stopping = False
+
+    def url(self, worker: int) -> str:
+        return f"http://127.0.0.1:{self.base_port + worker}"
+
+    def spawn(self, worker: int):
+        env = dict(os.environ, WORKER_INDEX=str(worker), PORT=str(self.base_port + worker))
+        self.processes[worker] = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        logger.info(f"👷 Worker {worker} started (pid {self.processes[worker].pid})")
+
+    def start(self):
+        for worker in range(self.count):
+            self.spawn(worker)
+
+    async def watch(self, interval: float = 1):
+        """Restart workers that exit, each on its own backoff schedule"""
+        delays = [0.0] * self.count
+        restart_at = [None] * self.count
+        while not self._stopping:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for worker, process in enumerate(self.processes):
+                if self._stopping or process.poll() is None:
+                    continue
+                if restart_at[worker] is None:
+                    delays[worker] = min(60.0, delays[worker] * 2 or 1.0)
+                    logger.error(f"❌ Worker {worker} exited with {process.returncode}, "
+                                 f"restarting in {delays[worker]:.0f}s")
+                    restart_at[worker] = now + delays[worker] * random.uniform(0.5, 1)
+                elif now >= restart_at[worker]:
+                    restart_at[worker] = None
+                    self.spawn(worker)
+                    self.restarts[worker] += 1
+
+    async def stop(self, timeout: float):
+        """SIGTERM every worker so they drain, then wait for them"""
+        self._stopping = True
+        for process in self.processes:
+            if process and process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            if process:
+                try:
+                    await asyncio.to_thread(process.wait, timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    def stats(self) -> list:
+        return [{'worker': worker, 'pid': process.pid if process else None,
+                 'alive': bool(process) and process.poll() is None, 'restarts': self.restarts[worker]}
+                for worker, process in enumerate(self.processes)]
+
+class FrontRouter:
+    """Receives webhook updates and forwards each to the worker owning its user"""
+
+    def __init__(self, pool: WorkerPool, shared: SharedBackend):
+        self.pool = pool
+        self.shared = shared
+        self.session = None
+        self.forwarded = [0] * pool.count
+
+    async def start(self):
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=64))
+
+    async def close(self):
+        await self.session.close()
+
+    async def route_update(self, request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != WEBHOOK_SECRET:
+            return web.Response(status=403)
+        body = await request.read()
+        try:
+            worker = shard_for(self.owner_of(json.loads(body)), self.pool.count)
+        except (ValueError, AttributeError):
+            return web.Response(status=400)
+        
+        headers = {'Content-Type': 'application/json'}
+        if WEBHOOK_SECRET:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = WEBHOOK_SECRET
+        try:
+            async with self.session.post(f"{self.pool.url(worker)}{WEBHOOK_PATH}", data=body, headers=headers) as response:
+                status = response.status
+        except aiohttp.ClientError:
+            # Telegram redelivers on non-2xx
+            return web.Response(status=503)
+        self.forwarded[worker] += 1
+        return web.Response(status=status)
+
+    def owner_of(self, payload: dict) -> int:
+        """User whose worker handles an update: staff order actions go to the order owner's worker"""
+        data = (payload.get('callback_query') or {}).get('data') or ''
+        if data.startswith(f"{CALLBACK_VERSION}:admin_"):
+            order = self.shared.fetch_order(data.rsplit(':', 1)[-1])
+            if order is not None:
+                return order['user_id']
+        return update_user_id(payload)
+
+    async def get_order(self, request: web.Request) -> web.Response:
+        check_admin(request)
+        data = self.shared.fetch_order(request.match_info['order_id'].upper())
+        if data is None:
+            raise web.HTTPNotFound()
+        return web.json_response(data)
+
+    async def list_orders(self, request: web.Request) -> web.Response:
+        """Ask every worker for a page and merge them; order IDs sort globally, so cursors carry over"""
+        check_admin(request)
+        headers = {'Authorization': request.headers['Authorization']}
+
+        async def fetch(worker: int) -> dict:
+            async with self.session.get(f"{self.pool.url(worker)}/admin/orders", params=request.query,
+                                        headers=headers) as response:
+                if response.status == 400:
+                    raise web.HTTPBadRequest(text=await response.text())
+                if response.status != 200:
+                    raise web.HTTPBadGateway()
+                return await response.json()
+
+        pages = await asyncio.gather(*(fetch(worker) for worker in range(self.pool.count)))
+        limit = int(request.query.get('limit', 50))
+        merged = list(heapq.merge(*(page['orders'] for page in pages), key=lambda order: order['order_id']))
+        more = len(merged) > limit or any(page['next_cursor'] for page in pages)
+        orders = merged[:limit]
+        return web.json_response({
+            'orders': orders,
+            'next_cursor': orders[-1]['order_id'] if more and orders else None,
+        })
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'healthy' if all(worker['alive'] for worker in self.pool.stats()) else 'degraded',
+            'service': 'Skeleton Trending Boost Bot',
+            'timestamp': datetime.now().isoformat(),
+            'mode': 'router',
+            'workers': [dict(worker, forwarded=self.forwarded[worker['worker']]) for worker in self.pool.stats()],
+            'totals': await asyncio.to_thread(self.shared.counters),
+        })
+
+    async def livez(self, request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def readyz(self, request: web.Request) -> web.Response:
+        """Ready while every worker process is up; workers report their own readiness"""
+        if all(worker['alive'] for worker in self.pool.stats()):
+            return web.Response(text="ok")
+        return web.Response(status=503, text="not ready")
+
+    def create_web_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', home)
+        app.router.add_get('/health', self.health)
+        app.router.add_get('/livez', self.livez)
+        app.router.add_get('/readyz', self.readyz)
+        app.router.add_get('/info', info)
+        app.router.add_post(WEBHOOK_PATH, self.route_update)
+        if ADMIN_TOKEN:
+            app.router.add_get('/admin/orders', self.list_orders)
+            app.router.add_get('/admin/orders/{order_id}', self.get_order)
+        return app
+
+async def register_webhook():
+    """Point Telegram at the front router; workers never touch the webhook"""
+    async with Bot(BOT_TOKEN, base_url=BOT_API_URL or 'https://api.telegram.org/bot') as telegram_bot:
+        await telegram_bot.set_webhook(
+            url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=True,
+            secret_token=WEBHOOK_SECRET or None
+        )
+
+async def run_front_router():
+    """Run the front router and its workers until SIGTERM/SIGINT"""
+    shared = create_shared_backend()
+    pool = WorkerPool(WORKERS, WORKER_BASE_PORT)
+    front = FrontRouter(pool, shared)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    
+    pool.start()
+    await front.start()
+    runner = web.AppRunner(front.create_web_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host='0.0.0.0', port=PORT).start()
+    logger.info(f"🔀 Routing updates on port {PORT} to {WORKERS} workers")
     
-    # Development mode
-    flask_app.run(host='0.0.0.0', port=PORT, debug=False, use_reloader=False)
+    watcher = asyncio.create_task(pool.watch())
+    try:
+        delay = 1
+        while not stop.is_set():
+            try:
+                logger.info(f"🤖 Setting webhook to {WEBHOOK_URL}{WEBHOOK_PATH}")
+                await register_webhook()
+                break
+            except Exception as e:
+                logger.error(f"❌ Failed to set webhook: {e}, retrying in {delay}s")
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    delay = min(60, delay * 2)
+        await stop.wait()
+    finally:
+        watcher.cancel()
+        await pool.stop(supervisor.drain_timeout + 5)
+        await runner.cleanup()
+        await front.close()
+        await asyncio.to_thread(shared.close)
 
 # ==================== TELEGRAM BOT RUNNER ====================
 
-def run_telegram_bot():
-    """Run the Telegram bot with retry logic"""
-    if not BOT_TOKEN:
-        logger.error("❌ BOT_TOKEN not set! Bot cannot start.")
-        logger.error("Please set BOT_TOKEN in Render environment variables")
-        return
+def build_application(base_url: str = BOT_API_URL) -> Application:
+    """Create the Telegram application with all handlers registered"""
+    builder = Application.builder().token(BOT_TOKEN).rate_limiter(outbound).concurrent_updates(update_processor)
+    # getUpdates long-polls on its own connection so it never waits behind sends
+    builder = builder.request(create_api_request()).get_updates_request(
+        create_api_request(pool_size=1, keepalive=1, method_timeouts=None))
+    builder = builder.persistence(StorePersistence(bot.store, update_interval=PERSISTENCE_INTERVAL))
+    if base_url:
+        builder = builder.base_url(base_url)
+    if BOT_MODE == 'webhook':
+        # Updates arrive through the web server, no Updater needed
+        builder = builder.updater(None)
+    application = builder.build()
+    
+    # Create conversation handler
+    conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('start', start_command)],
+        states={
+            MAIN_MENU: [
+                CallbackQueryHandler(router.dispatch),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message)
+            ],
+            SELECT_CHAIN: [CallbackQueryHandler(router.dispatch)],
+            SELECT_DURATION: [CallbackQueryHandler(router.dispatch)],
+            TOKEN_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_token_address)],
+            TELEGRAM_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_telegram_link)],
+            TWITTER_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_twitter_link)]
+        },
+        fallbacks=[CommandHandler('start', start_command)],
+        name='order_flow',
+        persistent=True
+    )
     
-    max_retries = 5
-    retry_delay = 30
+    # Add handlers
+    application.add_handler(conv_handler)
+    # Digest buttons work outside the order conversation, e.g. in a staff group
+    application.add_handler(CallbackQueryHandler(router.dispatch, pattern=f"^{CALLBACK_VERSION}:admin_"))
+    application.add_handler(CommandHandler("help", start_command))
+    application.add_handler(CommandHandler("order", order_command))
+    application.add_error_handler(error_handler)
     
-    for attempt in range(max_retries):
+    # Housekeeping
+    application.job_queue.run_repeating(evict_stale_job, interval=EVICTION_INTERVAL, first=EVICTION_INTERVAL)
+    if bot.pricing.source:
+        application.job_queue.run_repeating(refresh_prices_job, interval=RATE_REFRESH_INTERVAL, first=0)
+    if admin_digest.chat_id is not None and WORKER_INDEX in (None, DIGEST_WORKER):
+        application.job_queue.run_repeating(admin_digest_job, interval=ADMIN_DIGEST_INTERVAL, first=ADMIN_DIGEST_INTERVAL)
+    if bot.payments.source:
+        application.job_queue.run_repeating(match_payments_job, interval=PAYMENT_POLL_INTERVAL, first=PAYMENT_POLL_INTERVAL)
+    if CONFIG_FILE:
+        application.job_queue.run_repeating(watch_config_job, interval=CONFIG_WATCH_INTERVAL, first=0, data={})
+    return application
+
+async def drain_updates(application: Application, timeout: float):
+    """Wait for queued and in-flight updates to finish, up to ``timeout`` seconds"""
+    deadline = time.monotonic() + timeout
+    while not application.update_queue.empty() or update_processor.pending:
+        if time.monotonic() >= deadline:
+            logger.warning(f"⚠️ Drain timed out with {application.update_queue.qsize()} queued "
+                           f"and {update_processor.pending} in-flight updates")
+            return
+        await asyncio.sleep(0.05)
+
+async def run_telegram_bot(stop: asyncio.Event, drain_timeout: float = 10):
+    """Run one Application from start-up until ``stop`` is set, then drain and stop it"""
+    global telegram_app
+    
+    # Create Application
+    application = build_application()
+    
+    async with application:
+        # Log startup info
+        logger.info("✅ Bot application created successfully")
+        logger.info(f"🌐 Health check: http://localhost:{PORT}/health")
+        logger.info(f"📊 Info: http://localhost:{PORT}/info")
+        logger.info(f"🤖 Bot username: @{(application.bot.username or 'Unknown')}")
+        
+        await application.start()
         try:
-            logger.info(f"🚀 Starting Telegram bot (Attempt {attempt + 1}/{max_retries})")
-            
-            # Create Application
-            application = Application.builder().token(BOT_TOKEN).build()
-            
-            # Create conversation handler
-            conv_handler = ConversationHandler(
-                entry_points=[CommandHandler('start', start_command)],
-                states={
-                    MAIN_MENU: [
-                        CallbackQueryHandler(handle_button_press),
-                        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message)
-                    ],
-                    SELECT_CHAIN: [CallbackQueryHandler(handle_button_press)],
-                    SELECT_DURATION: [CallbackQueryHandler(handle_button_press)],
-                    TOKEN_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_token_address)],
-                    TELEGRAM_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_telegram_link)],
-                    TWITTER_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_twitter_link)]
-                },
-                fallbacks=[CommandHandler('start', start_command)]
-            )
-            
-            # Add handlers
-            application.add_handler(conv_handler)
-            application.add_handler(CommandHandler("help", start_command))
-            application.add_error_handler(error_handler)
-            
-            # Log startup info
-            logger.info("✅ Bot application created successfully")
-            logger.info(f"🌐 Health check: http://localhost:{PORT}/health")
-            logger.info(f"📊 Info: http://localhost:{PORT}/info")
-            logger.info(f"🤖 Bot username: @{(application.bot.username or 'Unknown')}")
+            if BOT_MODE == 'webhook' and WORKER_INDEX is not None:
+                logger.info(f"👷 Worker {WORKER_INDEX} taking updates from the front router")
+            elif BOT_MODE == 'webhook':
+                logger.info(f"🤖 Setting webhook to {WEBHOOK_URL}{WEBHOOK_PATH}")
+                await application.bot.set_webhook(
+                    url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True,
+                    secret_token=WEBHOOK_SECRET or None
+                )
+            else:
+                logger.info("🤖 Starting bot polling...")
+                await application.updater.start_polling(
+                    drop_pending_updates=True,
+                    allowed_updates=Update.ALL_TYPES
+                )
+            telegram_app = application
             
-            # Start bot polling
-            logger.info("🤖 Starting bot polling...")
-            await application.run_polling(
-                drop_pending_updates=True,
-                allowed_updates=Update.ALL_TYPES,
-                close_loop=False
-            )
+            # Serve until asked to stop
+            await stop.wait()
+        finally:
+            # Stop taking updates (the webhook answers 503 so Telegram redelivers),
+            # then let accepted ones finish
+            telegram_app = None
+            if application.updater and application.updater.running:
+                await application.updater.stop()
+            await drain_updates(application, drain_timeout)
+            await application.stop()
+
+class BotSupervisor:
+    """Keep the bot running: restart with jittered exponential backoff and a circuit breaker"""
+
+    def __init__(self, base_delay: float = 1, max_delay: float = 60, circuit_threshold: int = 8,
+                 circuit_cooldown: float = 300, stable_after: float = 60, drain_timeout: float = 10):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.circuit_threshold = circuit_threshold
+        self.circuit_cooldown = circuit_cooldown
+        self.stable_after = stable_after
+        self.drain_timeout = drain_timeout
+        self.state = 'idle'
+        self.restarts = 0
+        self.failures = 0
+        self.last_error = None
+        self.next_attempt = None
+        self._stop = asyncio.Event()
+
+    def backoff(self) -> float:
+        """Delay before the next attempt: exponential in failures, with jitter"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def stop(self):
+        """Ask the bot to drain and stop; safe to call from a signal handler"""
+        if not self._stop.is_set():
+            logger.info("🛑 Shutdown requested, draining updates...")
+            self._stop.set()
+
+    async def run(self):
+        if not BOT_TOKEN:
+            self.state = 'disabled'
+            logger.error("❌ BOT_TOKEN not set! Bot cannot start.")
+            logger.error("Please set BOT_TOKEN in Render environment variables")
+            return
+        
+        while not self._stop.is_set():
+            self.state = 'starting'
+            logger.info(f"🚀 Starting Telegram bot (restart #{self.restarts})" if self.restarts else "🚀 Starting Telegram bot")
+            started = time.monotonic()
+            try:
+                await run_telegram_bot(self._stop, self.drain_timeout)
+            except Exception as e:
+                if time.monotonic() - started >= self.stable_after:
+                    self.failures = 0
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error(f"❌ Bot crashed ({self.failures} in a row): {e}")
+            else:
+                break
             
-        except Exception as e:
-            logger.error(f"❌ Bot crashed on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                logger.info(f"⏱️ Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
+            if self.failures >= self.circuit_threshold:
+                self.state = 'circuit_open'
+                delay = self.circuit_cooldown
+                logger.error(f"🚨 {self.failures} failures in a row, pausing restarts for {delay:.0f}s")
             else:
-                logger.error("🚨 Max retries reached. Bot stopped.")
-                raise
+                self.state = 'backoff'
+                delay = self.backoff()
+                logger.info(f"⏱️ Retrying in {delay:.1f} seconds...")
+            
+            self.next_attempt = time.time() + delay
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self.next_attempt = None
+            self.restarts += 1
+        
+        self.state = 'stopped'
+
+    def stats(self) -> dict:
+        return {
+            'state': 'running' if self.state == 'starting' and telegram_app is not None else self.state,
+            'restarts': self.restarts,
+            'consecutive_failures': self.failures,
+            'last_error': self.last_error,
+            'next_attempt_in': round(max(0.0, self.next_attempt - time.time()), 1) if self.next_attempt else None,
+        }
+
+supervisor = BotSupervisor(drain_timeout=float(os.getenv("DRAIN_TIMEOUT", 10)))
 
 async def main_async():
-    """Async main function to run both bot and Flask"""
-    # Start bot in background task
-    bot_task = asyncio.create_task(run_telegram_bot())
-    
-    # Run Flask in separate thread
-    import threading
-    flask_thread = threading.Thread(target=run_flask_app, daemon=True)
-    flask_thread.start()
+    """Async main function to run the bot and web server on one event loop"""
+    if WORKERS > 1 and WORKER_INDEX is None:
+        await run_front_router()
+        return
     
-    # Wait for bot task (it will run until stopped)
-    await bot_task
+    bot.open_store(create_store())
+    bot.shared = create_shared_backend()
+    loop = asyncio.get_running_loop()
+    if hasattr(signal, 'SIGHUP'):
+        loop.add_signal_handler(signal.SIGHUP, reload_config)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, supervisor.stop)
+        except NotImplementedError:
+            # Windows: Ctrl+C still interrupts, just without a drain
+            pass
+    health_publisher.publish()
+    runner = await start_web_server()
+    loop_monitor = asyncio.create_task(monitor_event_loop())
+    try:
+        await supervisor.run()
+    finally:
+        loop_monitor.cancel()
+        await runner.cleanup()
+        await asyncio.to_thread(bot.store.close)
+        await asyncio.to_thread(bot.shared.close)
 
 def main():
     """Main entry point"""
     print("🚀 Initializing Skeleton Trending Boost Bot...")
     print(f"📝 BOT_TOKEN: {'✅ Set' if BOT_TOKEN else '❌ NOT SET - Bot will not work!'}")
     print(f"🔧 PORT: {PORT}")
+    print(f"📡 Mode: {BOT_MODE}")
     print(f"🌍 Environment: {'Render' if os.getenv('RENDER') else 'Local'}")
     
     if not BOT_TOKEN:
@@ -850,6 +4174,14 @@ def main():
         print("📋 Get token from @BotFather on Telegram")
         return
     
+    if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+        print("\n❌ CRITICAL ERROR: BOT_MODE=webhook requires WEBHOOK_URL!")
+        return
+    
+    if WORKERS > 1 and BOT_MODE != 'webhook':
+        print("\n❌ CRITICAL ERROR: WORKERS > 1 requires BOT_MODE=webhook!")
+        return
+    
     # Run the async main function
     asyncio.run(main_async())
 
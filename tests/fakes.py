@@ -0,0 +1,33 @@
+"""Stand-ins for the Telegram objects handlers touch"""
+
+from types import SimpleNamespace
+
+
+class FakeMessage:
+    def __init__(self, text=''):
+        self.text = text
+        self.message_id = 1
+        self.replies = []
+    
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class FakeQuery:
+    message = None
+    
+    def __init__(self, query_id='1'):
+        self.id = query_id
+        self.edits = []
+        self.answers = []
+    
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+    
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+def message_update(user_id, text):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=SimpleNamespace(id=user_id),
+                           message=FakeMessage(text))
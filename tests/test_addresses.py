@@ -0,0 +1,62 @@
+import hashlib
+
+import pytest
+
+from bot import AddressValidator, _keccak_f, keccak256, to_checksum_address
+
+
+@pytest.mark.parametrize('data, digest', [
+    (b'', 'c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470'),
+    (b'abc', '4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45'),
+    (b'The quick brown fox jumps over the lazy dog',
+     '4d741b6f1eb29cb2a9b9911c82f56fa8d73b04959d3d9d222895df6c0b28aa15'),
+])
+def test_keccak256_vectors(data, digest):
+    assert keccak256(data).hex() == digest
+
+
+@pytest.mark.parametrize('length', [0, 135, 136, 137, 272, 300])
+def test_permutation_matches_sha3_across_block_boundaries(length):
+    # SHA3-256 is the same sponge with a different padding byte
+    data = bytes(range(256)) * 2
+    padded = bytearray(data[:length]) + b'\x06'
+    padded.extend(bytes(-len(padded) % 136))
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for offset in range(0, len(padded), 136):
+        for i in range(17):
+            state[i] ^= int.from_bytes(padded[offset + 8 * i:offset + 8 * i + 8], 'little')
+        _keccak_f(state)
+    digest = b''.join(lane.to_bytes(8, 'little') for lane in state[:4])
+    assert digest == hashlib.sha3_256(data[:length]).digest()
+
+
+EIP55_ADDRESSES = [
+    '0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed',
+    '0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359',
+    '0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB',
+    '0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb',
+]
+
+
+@pytest.mark.parametrize('address', EIP55_ADDRESSES)
+def test_checksum_address(address):
+    assert to_checksum_address(address.lower()) == address
+    assert AddressValidator().validate('eth', address) is None
+
+
+def test_evm_addresses():
+    validator = AddressValidator()
+    address = EIP55_ADDRESSES[0]
+    assert validator.validate('bsc', address.lower()) is None
+    assert validator.validate('bsc', '0x' + address[2:].upper()) is None
+    assert validator.validate('base', address.replace('a', 'A', 1)) == "has an invalid EIP-55 checksum"
+    assert validator.validate('eth', address[:-1]) == "must be 0x followed by 40 hex characters"
+
+
+def test_solana_addresses():
+    validator = AddressValidator()
+    assert validator.validate('sol', 'So11111111111111111111111111111111111111112') is None
+    assert validator.validate('pumpfun', 'So1111111111111111111111111111111') == "does not decode to a 32-byte public key"
+    assert validator.validate('sol', '0OIl' * 10) == "must be 32-44 base58 characters"
+    assert validator.validate('tron', 'T' * 34) == "unsupported chain 'tron'"
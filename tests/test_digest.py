@@ -0,0 +1,69 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import bot as botmod
+from bot import AdminDigest, Chain, Duration, Order, SkeletonTrendingBot, SQLiteSharedBackend
+
+
+class FakeTelegramBot:
+    def __init__(self):
+        self.messages = []
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append((chat_id, text))
+
+
+def submitted_order(user_id, order_id):
+    order = Order(user_id, chain=Chain.SOL, duration=Duration.H24, order_id=order_id)
+    order.amount, order.pay_to = 1.5, 'So1anaWa11et'
+    return order
+
+
+def wait_for_events(backend, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    events = []
+    while len(events) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+        events += backend.take_digest_events()
+    return events
+
+
+def test_workers_share_one_digest(tmp_path, monkeypatch):
+    path = str(tmp_path / 'shared.db')
+    b = SkeletonTrendingBot()
+    monkeypatch.setattr(botmod, 'bot', b)
+    
+    # Workers 1 and 2 only push their events
+    monkeypatch.setattr(botmod, 'WORKER_INDEX', 1)
+    b.shared = SQLiteSharedBackend(path)
+    AdminDigest(chat_id=99).add(submitted_order(1, 'ORD-A'), 'new')
+    monkeypatch.setattr(botmod, 'WORKER_INDEX', 2)
+    pusher = AdminDigest(chat_id=99)
+    pusher.add(submitted_order(2, 'ORD-B'), 'new')
+    pusher.add(submitted_order(2, 'ORD-B'), 'payment_sent')
+    assert pusher.stats()['pending'] == 0
+    b.shared.close()
+    
+    # The digest worker sends everything in one message
+    monkeypatch.setattr(botmod, 'WORKER_INDEX', botmod.DIGEST_WORKER)
+    b.shared = SQLiteSharedBackend(path)
+    monkeypatch.setattr(botmod, 'admin_digest', AdminDigest(chat_id=99))
+    telegram_bot = FakeTelegramBot()
+    asyncio.run(botmod.admin_digest_job(SimpleNamespace(bot=telegram_bot)))
+    assert len(telegram_bot.messages) == 1
+    text = telegram_bot.messages[0][1]
+    assert 'ORD-A' in text and 'ORD-B' in text and 'payment sent' in text
+    
+    # Taken events are gone
+    assert b.shared.take_digest_events() == []
+    b.shared.close()
+
+
+def test_taken_events_are_not_returned_again(tmp_path):
+    backend = SQLiteSharedBackend(str(tmp_path / 'shared.db'))
+    backend.push_digest_event('ORD-A', 'new', {'order_id': 'ORD-A'})
+    assert [event[:2] for event in wait_for_events(backend, 1)] == [('ORD-A', 'new')]
+    backend.push_digest_event('ORD-A', 'paid', {'order_id': 'ORD-A'})
+    assert [event[:2] for event in wait_for_events(backend, 1)] == [('ORD-A', 'paid')]
+    backend.close()
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import bot as botmod
+from bot import Chain, Duration, SkeletonTrendingBot
+from fakes import FakeQuery, message_update
+
+
+def evict_order(b, user_id):
+    b.get_order(user_id).touched = 0
+    assert b.evict_stale(time.time())[0] == 1
+
+
+def test_address_after_eviction_restarts_at_chain_selection(monkeypatch):
+    b = SkeletonTrendingBot()
+    monkeypatch.setattr(botmod, 'bot', b)
+    order = b.draft_order(1)
+    order.chain, order.duration = Chain.SOL, Duration.H24
+    evict_order(b, 1)
+    
+    update = message_update(1, 'So11111111111111111111111111111111111111112')
+    state = asyncio.run(botmod.handle_token_address(update, None))
+    assert state == botmod.SELECT_CHAIN
+    assert 'expired' in update.message.replies[0]
+
+
+def test_summary_after_eviction_restarts_at_chain_selection(monkeypatch):
+    b = SkeletonTrendingBot()
+    monkeypatch.setattr(botmod, 'bot', b)
+    order = b.draft_order(1)
+    order.chain, order.duration = Chain.SOL, Duration.H24
+    order.token_address, order.telegram_link = 'So11111111111111111111111111111111111111112', 'https://t.me/example'
+    evict_order(b, 1)
+    
+    update = message_update(1, 'skip')
+    assert asyncio.run(botmod.handle_twitter_link(update, None)) == botmod.SELECT_CHAIN
+    assert len(b.order_index) == 0
+
+
+def test_duration_after_eviction_shows_chain_selection(monkeypatch):
+    b = SkeletonTrendingBot()
+    monkeypatch.setattr(botmod, 'bot', b)
+    b.draft_order(1).chain = Chain.ETH
+    evict_order(b, 1)
+    
+    query = FakeQuery()
+    assert asyncio.run(botmod.on_duration(query, 1, Duration.H4)) == botmod.SELECT_CHAIN
+    assert query.edits == [b.screens.get('chain_selection')[0]]
+
+
+def test_conversation_gauge_forgets_finished_and_evicted_users():
+    states = botmod.ConversationStates()
+    states.set(1, botmod.TOKEN_ADDRESS)
+    states.set(2, botmod.SELECT_CHAIN)
+    states.set(1, botmod.MAIN_MENU)
+    assert len(states) == 1
+    assert 'main_menu' not in states.counts
+    
+    states.forget(2)
+    assert len(states) == 0
+    assert set(states.counts.values()) == {0}
+
+
+def test_evicting_an_idle_user_forgets_their_conversation(monkeypatch):
+    states = botmod.ConversationStates()
+    monkeypatch.setattr(botmod.metrics, 'conversations', states)
+    b = SkeletonTrendingBot()
+    b.initialize_user(1).touched = 0
+    states.set(1, botmod.TELEGRAM_LINK)
+    
+    assert b.evict_stale(time.time()) == (0, 1)
+    assert len(states) == 0
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+import bot as botmod
+from bot import Chain, Duration, Order, OrderIndex, OrderStatus, encode_order_id
+
+START_MS = 1_700_000_000_000
+
+
+def make_index(count=40):
+    index = OrderIndex()
+    chains = [Chain.SOL, Chain.ETH, Chain.BSC, Chain.BASE]
+    for i in range(count):
+        order = Order(i, chain=chains[i % 4], duration=Duration.H4 if i % 2 else Duration.H24,
+                      order_id=encode_order_id(START_MS + i * 1000, i))
+        index.add(order)
+    for i in range(0, count, 5):
+        index.set_status(index.get(encode_order_id(START_MS + i * 1000, i)), OrderStatus.PAID)
+    return index
+
+
+def all_pages(index, limit, **filters):
+    orders, cursor, pages = [], None, 0
+    while True:
+        page, cursor = index.query(cursor=cursor, limit=limit, **filters)
+        orders.extend(page)
+        pages += 1
+        if cursor is None:
+            return orders, pages
+
+
+@pytest.mark.parametrize('limit', [1, 3, 7, 40, 100])
+def test_pages_cover_every_order_once_in_creation_order(limit):
+    index = make_index()
+    orders, pages = all_pages(index, limit)
+    assert [order.user_id for order in orders] == list(range(40))
+    assert pages == max(1, -(-40 // limit))
+
+
+@pytest.mark.parametrize('filters', [
+    {'status': OrderStatus.PAID},
+    {'chain': Chain.ETH},
+    {'chain': Chain.SOL, 'duration': Duration.H24},
+    {'status': OrderStatus.PENDING, 'chain': Chain.BSC, 'duration': Duration.H24},
+])
+def test_filtered_pages_match_a_full_scan(filters):
+    index = make_index()
+    expected = [order for order in (index.get(order_id) for order_id in sorted(index._orders))
+                if all(getattr(order, field) == value for field, value in filters.items())]
+    orders, _ = all_pages(index, 2, **filters)
+    assert orders == expected
+
+
+def test_selective_filter_takes_the_sorted_path():
+    # Eight paid orders among 400 is well under 1/16 of the range
+    index = make_index(400)
+    index.set_status(index.get(encode_order_id(START_MS, 0)), OrderStatus.REJECTED)
+    orders, _ = all_pages(index, 3, status=OrderStatus.REJECTED)
+    assert [order.user_id for order in orders] == [0]
+    paid, _ = all_pages(index, 3, status=OrderStatus.PAID, chain=Chain.BSC)
+    assert [order.user_id for order in paid] == [i for i in range(0, 400, 5) if i % 4 == 2]
+
+
+def test_time_range():
+    index = make_index()
+    since, until = (START_MS + 10_000) / 1000, (START_MS + 20_000) / 1000
+    orders, cursor = index.query(since=since, until=until, limit=5)
+    assert [order.user_id for order in orders] == [10, 11, 12, 13, 14]
+    orders, cursor = index.query(since=since, until=until, cursor=cursor, limit=5)
+    assert [order.user_id for order in orders] == [15, 16, 17, 18, 19]
+    assert cursor is None
+
+
+def test_adding_an_order_twice_is_a_no_op():
+    index = make_index(3)
+    index.add(index.get(encode_order_id(START_MS, 0)))
+    assert len(index) == 3
+    assert len(index.query(limit=10)[0]) == 3
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', '-1', '1e20'])
+def test_admin_query_rejects_unusable_timestamps(monkeypatch, value):
+    monkeypatch.setattr(botmod, 'ADMIN_TOKEN', 'secret')
+    request = make_mocked_request('GET', f'/admin/orders?since={value}', headers={'Authorization': 'Bearer secret'})
+    with pytest.raises(web.HTTPBadRequest):
+        asyncio.run(botmod.admin_list_orders(request))
+
+
+def test_admin_query_accepts_timestamps_and_dates(monkeypatch):
+    monkeypatch.setattr(botmod, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(botmod, 'bot', SimpleNamespace(order_index=make_index()))
+    request = make_mocked_request('GET', f'/admin/orders?since={(START_MS + 38_000) / 1000}&until=2100-01-01',
+                                  headers={'Authorization': 'Bearer secret'})
+    response = asyncio.run(botmod.admin_list_orders(request))
+    assert [order['user_id'] for order in json.loads(response.body)['orders']] == [38, 39]
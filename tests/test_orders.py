@@ -0,0 +1,86 @@
+import asyncio
+
+import bot as botmod
+from bot import Chain, Duration, SkeletonTrendingBot
+from fakes import FakeQuery, message_update
+
+
+def fill_order(b, user_id, chain=Chain.SOL, duration=Duration.H24):
+    order = b.draft_order(user_id)
+    order.chain = chain
+    order.duration = duration
+    order.token_address = 'So11111111111111111111111111111111111111112'
+    order.telegram_link = 'https://t.me/example'
+    return order
+
+
+def test_second_order_does_not_touch_the_first():
+    b = SkeletonTrendingBot()
+    b.initialize_user(1)
+    fill_order(b, 1)
+    b.create_order_summary(1, 'chat:1')
+    first = b.get_order(1)
+    first_id, first_key = first.order_id, first.idempotency_key
+    
+    second = fill_order(b, 1, chain=Chain.ETH, duration=Duration.H4)
+    assert second is not first
+    b.create_order_summary(1, 'chat:2')
+    
+    indexed = b.order_index.get(first_id)
+    assert indexed is first
+    assert (indexed.order_id, indexed.idempotency_key) == (first_id, first_key)
+    assert (indexed.chain, indexed.duration) == (Chain.SOL, Duration.H24)
+    assert second.order_id != first_id
+    assert [o.order_id for o in b.order_index.query(chain=Chain.SOL)[0]] == [first_id]
+    assert b.initialize_user(1).order_ids == (first_id, second.order_id)
+
+
+def test_resubmitting_with_the_same_key_keeps_the_order_id():
+    b = SkeletonTrendingBot()
+    b.initialize_user(1)
+    fill_order(b, 1)
+    b.create_order_summary(1, 'chat:1')
+    order_id = b.get_order(1).order_id
+    
+    b.create_order_summary(1, 'chat:1')
+    assert b.get_order(1).order_id == order_id
+    assert len(b.order_index) == 1
+    assert b.initialize_user(1).orders == 1
+
+
+def test_redelivered_twitter_link_shows_the_same_order(monkeypatch):
+    b = SkeletonTrendingBot()
+    monkeypatch.setattr(botmod, 'bot', b)
+    b.initialize_user(1)
+    fill_order(b, 1)
+    
+    first, again = message_update(1, 'skip'), message_update(1, 'skip')
+    for update in (first, again):
+        assert asyncio.run(botmod.handle_twitter_link(update, None)) == botmod.MAIN_MENU
+    assert len(b.order_index) == 1
+    assert b.initialize_user(1).orders == 1
+    assert first.message.replies == again.message.replies
+
+
+def test_payment_button_names_its_own_order(monkeypatch):
+    b = SkeletonTrendingBot()
+    digest = botmod.AdminDigest(chat_id=1)
+    monkeypatch.setattr(botmod, 'bot', b)
+    monkeypatch.setattr(botmod, 'admin_digest', digest)
+    b.initialize_user(1)
+    fill_order(b, 1)
+    b.create_order_summary(1, 'chat:1')
+    first_id = b.get_order(1).order_id
+    digest.drain()
+    # Started a new order since
+    b.reset_order(1)
+    
+    query = FakeQuery('q1')
+    assert asyncio.run(botmod.on_payment_sent(query, 1, first_id)) == botmod.MAIN_MENU
+    assert first_id in query.answers[0]
+    assert [(order.order_id, events) for order, events in digest.drain()] == [(first_id, ['payment_sent'])]
+    
+    stranger = FakeQuery('q2')
+    assert asyncio.run(botmod.on_payment_sent(stranger, 2, first_id)) is None
+    assert stranger.answers == ["❌ Order not found."]
+    assert digest.drain() == []
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from bot import PRIORITY_INTERACTIVE, PRIORITY_NOTICE, OutboundScheduler
+
+
+def run_with_scheduler(scheduler, body):
+    async def run():
+        await scheduler.initialize()
+        try:
+            return await body()
+        finally:
+            await scheduler.shutdown()
+    return asyncio.run(run())
+
+
+def sender(sent):
+    def send(endpoint, data, rate_limit_args=None):
+        async def callback():
+            sent.append((endpoint, data.get('text')))
+            return True
+        return callback, (), {}, endpoint, data, rate_limit_args
+    return send
+
+
+def test_global_rate_paces_after_the_burst():
+    scheduler = OutboundScheduler(global_rate=20, private_rate=100)
+    sent = []
+    send = sender(sent)
+    
+    async def body():
+        start = time.monotonic()
+        await asyncio.gather(*(scheduler.process_request(*send('sendMessage', {'chat_id': chat_id}))
+                               for chat_id in range(1, 31)))
+        return time.monotonic() - start
+    
+    # 20 go out as the initial burst, the other 10 at 20/s
+    elapsed = run_with_scheduler(scheduler, body)
+    assert len(sent) == 30
+    assert 0.4 < elapsed < 1.5
+
+
+def test_chat_rate_paces_one_chat():
+    scheduler = OutboundScheduler(global_rate=100, private_rate=10, chat_burst=1)
+    sent = []
+    send = sender(sent)
+    
+    async def body():
+        start = time.monotonic()
+        await asyncio.gather(*(scheduler.process_request(*send('sendMessage', {'chat_id': 7})) for _ in range(5)))
+        return time.monotonic() - start
+    
+    assert 0.35 < run_with_scheduler(scheduler, body) < 1.5
+
+
+def test_interactive_calls_jump_queued_notices():
+    scheduler = OutboundScheduler(global_rate=1, private_rate=100)
+    sent = []
+    send = sender(sent)
+    
+    async def body():
+        scheduler._global.tokens = 0
+        notices = [asyncio.create_task(scheduler.process_request(*send('sendMessage', {'chat_id': i, 'text': 'notice'},
+                                                                      PRIORITY_NOTICE)))
+                   for i in range(1, 3)]
+        await asyncio.sleep(0)
+        reply = asyncio.create_task(scheduler.process_request(*send('sendMessage', {'chat_id': 9, 'text': 'reply'},
+                                                                   PRIORITY_INTERACTIVE)))
+        await reply
+        for task in notices:
+            task.cancel()
+    
+    run_with_scheduler(scheduler, body)
+    assert sent[0] == ('sendMessage', 'reply')
+
+
+def test_pending_edits_of_one_message_coalesce():
+    scheduler = OutboundScheduler(global_rate=100, private_rate=10, chat_burst=1)
+    sent = []
+    send = sender(sent)
+    
+    async def body():
+        await scheduler.process_request(*send('sendMessage', {'chat_id': 7, 'text': 'first'}))
+        # The chat bucket is now empty, so these wait together
+        await asyncio.gather(*(scheduler.process_request(*send('editMessageText',
+                                                               {'chat_id': 7, 'message_id': 1, 'text': text}))
+                               for text in ('a', 'b', 'c')))
+    
+    run_with_scheduler(scheduler, body)
+    assert sent == [('sendMessage', 'first'), ('editMessageText', 'c')]
+    assert scheduler.coalesced == 2
+    assert scheduler.stats()['sent'] == 2
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import bot as botmod
+from bot import Chain, FakeChainSource, HttpTransferSource, Order, PaymentMatcher, Transfer
+
+WALLET = 'So1anaWa11et'
+
+
+def pending_order(order_id, amount, order_date=None):
+    order = Order(1, chain=Chain.SOL, order_id=order_id)
+    order.amount, order.pay_to = amount, WALLET
+    order.order_date = order_date or time.time()
+    return order
+
+
+def quoted_order(matcher, order_id, price):
+    order = pending_order(order_id, matcher.quote(Chain.SOL, WALLET, price))
+    matcher.watch(order)
+    return order
+
+
+def test_quoted_orders_match_without_memo():
+    source = FakeChainSource()
+    matcher = PaymentMatcher(source)
+    first = quoted_order(matcher, 'A', 1.5)
+    second = quoted_order(matcher, 'B', 1.5)
+    assert first.amount == 1.5
+    assert second.amount == pytest.approx(1.500001)
+    
+    source.send('sol', WALLET, second.amount)
+    source.send('sol', WALLET, first.amount)
+    matches = asyncio.run(matcher.poll())
+    assert [order.order_id for order, _ in matches] == ['B', 'A']
+    assert len(matcher) == 2
+
+
+def test_quote_reuses_amounts_once_freed():
+    matcher = PaymentMatcher()
+    first = quoted_order(matcher, 'A', 1.5)
+    matcher.unwatch(first)
+    assert matcher.quote(Chain.SOL, WALLET, 1.5) == 1.5
+
+
+def test_ambiguous_amount_needs_memo():
+    matcher = PaymentMatcher()
+    for order_id in ('A', 'B'):
+        matcher.watch(pending_order(order_id, 1.5))
+    
+    assert matcher.match(Transfer('tx1', 'sol', WALLET, 1.5)) is None
+    assert matcher.match(Transfer('tx2', 'sol', WALLET, 1.5, memo='b')).order_id == 'B'
+
+
+def test_unpaid_orders_expire_and_free_their_amount():
+    matcher = PaymentMatcher(ttl=60)
+    now = time.time()
+    stale = pending_order('A', 1.5, order_date=now - 120)
+    matcher.watch(stale, now=now - 90)
+    fresh = pending_order('B', 1.5, order_date=now)
+    
+    assert [order.order_id for order in matcher.expire(now)] == ['A']
+    assert matcher.stats()['expired'] == 1
+    matcher.watch(fresh, now=now)
+    assert matcher.match(Transfer('tx1', 'sol', WALLET, 1.5)) is fresh
+
+
+def test_watch_skips_orders_past_their_ttl():
+    matcher = PaymentMatcher(ttl=60)
+    matcher.watch(pending_order('A', 1.5, order_date=time.time() - 120))
+    assert len(matcher) == 0
+
+
+def test_orders_on_launchpad_chains_share_their_base_wallet():
+    source = FakeChainSource()
+    matcher = PaymentMatcher(source)
+    sol = pending_order('A', matcher.quote(Chain.SOL, WALLET, 5.25))
+    matcher.watch(sol)
+    pumpfun = Order(2, chain=Chain.PUMPFUN, order_id='B')
+    pumpfun.amount, pumpfun.pay_to, pumpfun.order_date = matcher.quote(Chain.PUMPFUN, WALLET, 5.25), WALLET, time.time()
+    matcher.watch(pumpfun)
+    assert pumpfun.amount != sol.amount
+    
+    # Solana indexers report launchpad payments as plain 'sol' transfers
+    source.send('sol', WALLET, pumpfun.amount)
+    assert [order.order_id for order, _ in asyncio.run(matcher.poll())] == ['B']
+
+
+def test_a_bad_transfer_does_not_lose_the_rest_of_the_batch():
+    source = FakeChainSource()
+    matcher = PaymentMatcher(source)
+    first = quoted_order(matcher, 'A', 1.5)
+    second = quoted_order(matcher, 'B', 2.5)
+    source.send('sol', WALLET, first.amount)
+    source.send('sol', WALLET, 'lots')
+    source.send('sol', WALLET, second.amount)
+    source.send('sol', WALLET, first.amount)
+    
+    matches = asyncio.run(matcher.poll())
+    assert [order.order_id for order, _ in matches] == ['A', 'B']
+    # Still watched until the caller marks them paid
+    assert len(matcher) == 2
+
+
+def test_http_source_skips_malformed_transfers_and_moves_on(monkeypatch):
+    payloads = iter([
+        {'transfers': [{'tx_hash': 'x', 'chain': 'sol'},
+                       {'tx_hash': 'y', 'chain': 'sol', 'wallet': WALLET, 'amount': 'nan'},
+                       {'tx_hash': 'z', 'chain': 'sol', 'wallet': WALLET, 'amount': '1.5', 'memo': 'a'}],
+         'cursor': 'next'},
+        {'transfers': [], 'cursor': 'last'},
+    ])
+    cursors = []
+    
+    def respond(request):
+        cursors.append(json.loads(request.content)['cursor'])
+        return httpx.Response(200, json=next(payloads))
+    
+    client = httpx.AsyncClient
+    monkeypatch.setattr(botmod.httpx, 'AsyncClient',
+                        lambda **kwargs: client(transport=httpx.MockTransport(respond), **kwargs))
+    source = HttpTransferSource('http://indexer.test/transfers')
+    source.cursor = 'start'
+    
+    assert asyncio.run(source.fetch([['sol', WALLET]])) == [Transfer('z', 'sol', WALLET, 1.5, 'a')]
+    assert asyncio.run(source.fetch([['sol', WALLET]])) == []
+    assert cursors == ['start', 'next']
+    assert source.cursor == 'last'
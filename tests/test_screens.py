@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import bot as botmod
+from bot import ScreenCache
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+
+def counting_builder(calls):
+    def build(*args):
+        calls.append(args)
+        return f"screen {len(calls)}", None
+    return build
+
+
+def test_static_screen_is_built_once_until_invalidated():
+    screens = ScreenCache()
+    calls = []
+    screens.register('menu', counting_builder(calls))
+    
+    assert screens.get('menu') == screens.get('menu') == ('screen 1', None)
+    screens.invalidate('menu')
+    assert screens.get('menu') == ('screen 2', None)
+    assert len(calls) == 2
+
+
+def test_timestamped_screen_is_rebuilt_when_the_minute_rolls_over(monkeypatch):
+    minute = 1_700_000_000 // 60 * 60
+    clock = Clock(minute + 5)
+    monkeypatch.setattr(botmod, 'time', SimpleNamespace(time=clock.time))
+    screens = ScreenCache()
+    calls = []
+    screens.register('welcome', counting_builder(calls), timestamped=True)
+    
+    first = screens.get('welcome')
+    clock.now += 50
+    assert screens.get('welcome') is first
+    clock.now += 10
+    assert screens.get('welcome') == ('screen 2', None)
+    # Each build gets the start of its minute
+    assert [args[0].timestamp() for args in calls] == [minute, minute + 60]
+
+
+def test_invalidate_all_and_reregister():
+    screens = ScreenCache()
+    menu_calls, nft_calls = [], []
+    screens.register('menu', counting_builder(menu_calls))
+    screens.register('nft', counting_builder(nft_calls))
+    screens.get('menu'), screens.get('nft')
+    
+    screens.invalidate()
+    screens.get('menu'), screens.get('nft')
+    assert (len(menu_calls), len(nft_calls)) == (2, 2)
+    
+    screens.register('menu', lambda: ('new menu', None))
+    assert screens.get('menu') == ('new menu', None)
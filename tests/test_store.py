@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+from bot import Chain, Duration, OrderStatus, SkeletonTrendingBot, SQLiteStore
+
+
+def open_bot(path):
+    b = SkeletonTrendingBot()
+    b.open_store(SQLiteStore(str(path)))
+    return b
+
+
+def test_state_survives_a_restart(tmp_path):
+    path = tmp_path / 'bot.db'
+    b = open_bot(path)
+    b.initialize_user(1)
+    order = b.draft_order(1)
+    order.chain, order.duration = Chain.SOL, Duration.H24
+    order.token_address, order.telegram_link = 'So11111111111111111111111111111111111111112', 'https://t.me/example'
+    order.order_date = time.time()
+    b.create_order_summary(1, 'chat:1')
+    submitted_id = order.order_id
+    
+    b.initialize_user(2)
+    b.draft_order(2).chain = Chain.ETH
+    b.save_order(2)
+    b.store.close()
+    
+    b = open_bot(path)
+    restored = b.order_index.get(submitted_id)
+    assert restored.status == OrderStatus.PENDING
+    assert (restored.chain, restored.duration, restored.amount) == (Chain.SOL, Duration.H24, order.amount)
+    # Still the user's current order, as one object, and watched for payment again
+    assert b.get_order(1) is restored
+    assert len(b.payments) == 1
+    assert b.get_order(2).chain == Chain.ETH
+    assert b.initialize_user(1).order_ids == (submitted_id,)
+    b.store.close()
+
+
+def test_reads_see_unflushed_writes(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    store = SQLiteStore(path)
+    # No writer thread until load(), so these are only in the unflushed map
+    store.save_user(5, {'orders': 3})
+    store.save_order(5, {'user_id': 5})
+    store.delete_order(5)
+    assert store.fetch_user(5) == {'orders': 3}
+    assert store.fetch_order(5) is None
+    store.load()
+    store.close()
+    
+    store = SQLiteStore(path)
+    orders, users = store.load()
+    assert (orders, users) == ({}, {5: {'orders': 3}})
+    store.close()
+
+
+def test_status_changes_are_recovered(tmp_path):
+    path = tmp_path / 'bot.db'
+    b = open_bot(path)
+    b.initialize_user(1)
+    order = b.draft_order(1)
+    order.chain, order.duration = Chain.ETH, Duration.H4
+    order.token_address, order.telegram_link = '0x' + '1' * 40, 'https://t.me/example'
+    order.order_date = time.time()
+    b.create_order_summary(1, 'chat:1')
+    b.set_order_status(order, OrderStatus.PAID)
+    b.store.close()
+    
+    b = open_bot(path)
+    assert b.find_order(order.order_id).status == OrderStatus.PAID
+    assert len(b.payments) == 0
+    assert b.order_index.query(status=OrderStatus.PAID)[0] == [b.order_index.get(order.order_id)]
+    b.store.close()
+
+
+class FlakyConnection:
+    """Fails the first ``failures`` writes with SQLITE_BUSY"""
+    
+    def __init__(self, conn, failures):
+        self.conn = conn
+        self.failures = failures
+    
+    def execute(self, sql, *args):
+        if sql.startswith('INSERT') and self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError('database is locked')
+        return self.conn.execute(sql, *args)
+    
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def test_failed_batches_are_retried_not_dropped(tmp_path):
+    path = str(tmp_path / 'bot.db')
+    store = SQLiteStore(path)
+    connect = store._connect
+    store._connect = lambda: FlakyConnection(connect(), failures=3)
+    store.load()
+    store.save_user(5, {'orders': 3})
+    store.close()
+    
+    store = SQLiteStore(path)
+    assert store.load()[1] == {5: {'orders': 3}}
+    store.close()
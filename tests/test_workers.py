@@ -0,0 +1,31 @@
+import asyncio
+
+import bot as botmod
+from bot import WorkerPool
+
+
+class FakeProcess:
+    pid = 1
+    
+    def __init__(self, returncode=None):
+        self.returncode = returncode
+    
+    def poll(self):
+        return self.returncode
+
+
+def test_dead_workers_restart_on_their_own_schedule(monkeypatch):
+    pool = WorkerPool(2, 9000)
+    pool.processes = [FakeProcess(1), FakeProcess(1)]
+    monkeypatch.setattr(pool, 'spawn', lambda worker: pool.processes.__setitem__(worker, FakeProcess()))
+    monkeypatch.setattr(botmod.random, 'uniform', lambda low, high: high)
+    
+    async def run():
+        watcher = asyncio.create_task(pool.watch(interval=0.05))
+        await asyncio.sleep(1.5)
+        pool._stopping = True
+        await watcher
+    
+    # One second of backoff each, served side by side rather than one after the other
+    asyncio.run(run())
+    assert pool.restarts == [1, 1]